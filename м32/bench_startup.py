@@ -0,0 +1,59 @@
+# bench_startup.py
+"""
+Бенчмарк часу запуску застосунку.
+
+Створює тимчасову БД із великою кількістю продажів і вимірює:
+  - init_db() на новій БД та на БД з актуальною схемою;
+  - seed_test_data();
+  - копіювання кешованого шаблону в БД у пам'яті (testing.memory_db);
+  - побудову FurnitureApp до першого відображення вікна (якщо є дисплей).
+
+Запуск:  python bench_startup.py [кількість_продажів]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import config
+import db
+import testing
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<32} {elapsed:10.1f} ms")
+    return result
+
+
+def main():
+    sales_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    timed("шаблон тестової БД (кеш)", testing.build_template, sales_count)
+    start = time.perf_counter()
+    with testing.memory_db(sales_count):
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{'memory_db (з шаблону)':<32} {elapsed:10.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp, config.using(db_path=os.path.join(tmp, "bench.db")):
+        timed("init_db (нова БД)", db.init_db)
+        timed("seed_test_data", db.seed_test_data)
+        testing.fill_sales(sales_count)
+        print(f"{'продажів у БД':<32} {sales_count:10d}")
+        timed("init_db (схема актуальна)", db.init_db)
+
+        try:
+            from ui import FurnitureApp
+            app = timed("FurnitureApp()", FurnitureApp)
+        except Exception as e:  # немає дисплея / Tk
+            print(f"UI пропущено: {e}")
+            return
+
+        timed("перше відображення вікна", app.update)
+        app.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# charts.py
+"""
+Графіки виручки на tk.Canvas.
+
+Дані стискаються в шарі БД (report_revenue_series), тому на екран
+потрапляє не більше ~ширина/2 точок. Масштабування (коліщатко миші) та
+прокрутка (перетягування) змінюють період і повторно запитують БД
+з відповідною деталізацією.
+"""
+import datetime
+import tkinter as tk
+
+from db import (
+    report_sales_date_range,
+    report_revenue_series,
+    report_revenue_by_category,
+)
+
+
+PAD_LEFT = 70
+PAD_RIGHT = 15
+PAD_TOP = 15
+PAD_BOTTOM = 25
+PIXELS_PER_POINT = 2
+MIN_SPAN_DAYS = 7
+
+
+def _to_date(iso):
+    return datetime.date.fromisoformat(iso)
+
+
+def _format_money(kopecks):
+    """Підпис осі / стовпця: сума в копійках (Money) -> «1.2 млн», «35 тис»."""
+    value = kopecks / 100
+    if value >= 1_000_000:
+        return f"{value / 1_000_000:.1f} млн"
+    if value >= 1_000:
+        return f"{value / 1_000:.0f} тис"
+    return f"{value:.0f}"
+
+
+class RevenueChart(tk.Canvas):
+    """Лінійний графік виручки за днями з огинаючою мін./макс. у кожному інтервалі."""
+
+    def __init__(self, master, on_range_change=None, **kwargs):
+        kwargs.setdefault("background", "white")
+        kwargs.setdefault("highlightthickness", 0)
+        super().__init__(master, **kwargs)
+        self.on_range_change = on_range_change
+
+        self.bounds = (None, None)   # перша / остання дата продажу
+        self.date_from = None
+        self.date_to = None
+        self._reload_id = None
+        self._drag_x = None
+        self._drag_range = None
+
+        self.bind("<Configure>", lambda e: self.schedule_reload())
+        self.bind("<MouseWheel>", self.on_wheel)
+        self.bind("<Button-4>", lambda e: self.zoom(e.x, 0.8))
+        self.bind("<Button-5>", lambda e: self.zoom(e.x, 1.25))
+        self.bind("<ButtonPress-1>", self.on_drag_start)
+        self.bind("<B1-Motion>", self.on_drag)
+        self.bind("<Double-Button-1>", lambda e: self.reset_range())
+
+    # --- період -----------------------------------------------------------
+
+    def refresh(self):
+        """Перечитати межі даних (після нових продажів) і перемалювати."""
+        lo, hi = report_sales_date_range()
+        self.bounds = (_to_date(lo), _to_date(hi)) if lo else (None, None)
+        if self.date_from is None or self.bounds[0] is None:
+            self.date_from, self.date_to = self.bounds
+        self.reload()
+
+    def reset_range(self):
+        self.date_from, self.date_to = self.bounds
+        self.schedule_reload()
+
+    def set_range(self, date_from, date_to):
+        lo, hi = self.bounds
+        if lo is None:
+            return
+        span = max((date_to - date_from).days, MIN_SPAN_DAYS)
+        full = (hi - lo).days
+        if span >= full:
+            date_from, date_to = lo, hi
+        else:
+            date_from = min(max(date_from, lo), hi - datetime.timedelta(days=span))
+            date_to = date_from + datetime.timedelta(days=span)
+        self.date_from, self.date_to = date_from, date_to
+        self.schedule_reload()
+
+    def _plot_width(self):
+        return max(self.winfo_width() - PAD_LEFT - PAD_RIGHT, 1)
+
+    def _x_to_date(self, x):
+        span = (self.date_to - self.date_from).days
+        frac = min(max((x - PAD_LEFT) / self._plot_width(), 0.0), 1.0)
+        return self.date_from + datetime.timedelta(days=round(span * frac))
+
+    # --- масштаб і прокрутка ---------------------------------------------
+
+    def on_wheel(self, event):
+        self.zoom(event.x, 0.8 if event.delta > 0 else 1.25)
+
+    def zoom(self, x, factor):
+        if self.date_from is None:
+            return
+        center = self._x_to_date(x)
+        left = (center - self.date_from).days * factor
+        right = (self.date_to - center).days * factor
+        self.set_range(center - datetime.timedelta(days=round(left)),
+                       center + datetime.timedelta(days=round(right)))
+
+    def on_drag_start(self, event):
+        self._drag_x = event.x
+        self._drag_range = (self.date_from, self.date_to)
+
+    def on_drag(self, event):
+        if self._drag_range is None or self._drag_range[0] is None:
+            return
+        date_from, date_to = self._drag_range
+        span = (date_to - date_from).days
+        shift = datetime.timedelta(
+            days=round((self._drag_x - event.x) / self._plot_width() * span)
+        )
+        self.set_range(date_from + shift, date_to + shift)
+
+    # --- малювання --------------------------------------------------------
+
+    def schedule_reload(self, delay_ms=80):
+        """Відкласти запит, щоб серія подій Configure / прокрутки дала один запит."""
+        if self._reload_id is not None:
+            self.after_cancel(self._reload_id)
+        self._reload_id = self.after(delay_ms, self.reload)
+
+    def reload(self):
+        self._reload_id = None
+        self.delete("all")
+        if self.date_from is None:
+            self.create_text(self.winfo_width() // 2, self.winfo_height() // 2,
+                             text="Немає продажів")
+            return
+
+        buckets = max(self._plot_width() // PIXELS_PER_POINT, 1)
+        series = report_revenue_series(self.date_from.isoformat(),
+                                       self.date_to.isoformat(), buckets)
+        self.draw(series)
+        if self.on_range_change:
+            self.on_range_change(self.date_from, self.date_to)
+
+    def draw(self, series):
+        width = self.winfo_width()
+        height = self.winfo_height()
+        plot_w = self._plot_width()
+        plot_h = max(height - PAD_TOP - PAD_BOTTOM, 1)
+        span = max((self.date_to - self.date_from).days, 1)
+        y_max = max((row[3] for row in series), default=0) or 1
+
+        def x_of(iso):
+            return PAD_LEFT + (_to_date(iso) - self.date_from).days / span * plot_w
+
+        def y_of(value):
+            return PAD_TOP + plot_h - value / y_max * plot_h
+
+        # Осі та підписи
+        self.create_line(PAD_LEFT, PAD_TOP, PAD_LEFT, PAD_TOP + plot_h, fill="gray")
+        self.create_line(PAD_LEFT, PAD_TOP + plot_h, width - PAD_RIGHT,
+                         PAD_TOP + plot_h, fill="gray")
+        for frac in (0, 0.5, 1):
+            y = y_of(y_max * frac)
+            self.create_text(PAD_LEFT - 5, y, text=_format_money(y_max * frac), anchor="e")
+        self.create_text(PAD_LEFT, height - 5, anchor="sw",
+                         text=self.date_from.isoformat())
+        self.create_text(width - PAD_RIGHT, height - 5, anchor="se",
+                         text=self.date_to.isoformat())
+
+        # Огинаюча мін./макс. та лінія середньої денної виручки
+        points = []
+        for first, last, low, high, total, days in series:
+            x = (x_of(first) + x_of(last)) / 2
+            if high > low:
+                self.create_line(x, y_of(low), x, y_of(high), fill="#b7d3f0")
+            points.extend((x, y_of(total / days)))
+        if len(points) >= 4:
+            self.create_line(*points, fill="#1f6fbf", width=2)
+        elif points:
+            x, y = points
+            self.create_oval(x - 2, y - 2, x + 2, y + 2, fill="#1f6fbf", outline="")
+
+
+class CategoryChart(tk.Canvas):
+    """Горизонтальні стовпчики виручки за категоріями."""
+
+    def __init__(self, master, **kwargs):
+        kwargs.setdefault("background", "white")
+        kwargs.setdefault("highlightthickness", 0)
+        super().__init__(master, **kwargs)
+        self.rows = []
+        self._load_id = None
+        self.bind("<Configure>", lambda e: self.draw())
+
+    def schedule_load(self, date_from=None, date_to=None, delay_ms=300):
+        """Завантажити дані після того, як період перестане змінюватися."""
+        if self._load_id is not None:
+            self.after_cancel(self._load_id)
+        self._load_id = self.after(delay_ms, self.load, date_from, date_to)
+
+    def load(self, date_from=None, date_to=None):
+        self._load_id = None
+        self.rows = report_revenue_by_category(
+            date_from.isoformat() if date_from else None,
+            date_to.isoformat() if date_to else None,
+        )
+        self.draw()
+
+    def draw(self):
+        self.delete("all")
+        if not self.rows:
+            return
+        width = self.winfo_width()
+        height = self.winfo_height()
+        label_w = 110
+        bar_area = max(width - label_w - 90, 1)
+        row_h = max(min((height - 10) / len(self.rows), 24), 8)
+        top_total = self.rows[0][1] or 1
+
+        for i, (category, total) in enumerate(self.rows):
+            y = 5 + i * row_h
+            bar_w = total / top_total * bar_area
+            self.create_text(label_w - 5, y + row_h / 2, text=category, anchor="e")
+            self.create_rectangle(label_w, y + 2, label_w + bar_w, y + row_h - 2,
+                                  fill="#e39b3c", outline="")
+            self.create_text(label_w + bar_w + 5, y + row_h / 2,
+                             text=_format_money(total), anchor="w")
@@ -0,0 +1,252 @@
+# cli.py
+"""
+Командний рядок для звітів, експорту та обслуговування БД без графічного
+інтерфейсу (Tkinter не імпортується), зокрема для нічних завдань cron.
+
+Приклади:
+  python cli.py revenue --from 2024-01-01 --to 2024-12-31 -o revenue.csv
+  python cli.py revenue --by category
+  python cli.py stock --low 5
+  python cli.py sales --customer Петренко --limit 100
+  python cli.py import products.csv
+  python cli.py backup /backups/furniture_sales.db
+  python cli.py stats
+  python cli.py maintenance --steps optimize,checkpoint
+  python cli.py --db /srv/shop2/furniture_sales.db stats
+
+Шлях до БД: --db, інакше FURNITURE_DB / файл налаштувань (див. config.py).
+
+CSV пишеться з роздільником «;»; у файл — у кодуванні utf-8-sig (для Excel),
+у stdout — utf-8. Код виходу 0 — успіх, 1 — помилка (повідомлення в stderr).
+"""
+import argparse
+import contextlib
+import csv
+import datetime
+import os
+import sqlite3
+import sys
+
+import config
+import db
+import maintenance
+
+
+STOCK_HEADER = [
+    "ID", "Назва", "Категорія", "Матеріал", "Колір",
+    "Ширина", "Висота", "Глибина", "Ціна, грн", "Залишок",
+]
+
+
+def _date(text):
+    try:
+        return datetime.date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError("дата має бути у форматі РРРР-ММ-ДД")
+
+
+def _optional_float(text):
+    return float(text.replace(",", ".")) if text.strip() else None
+
+
+@contextlib.contextmanager
+def _output(path):
+    """CSV-writer у файл або stdout."""
+    if path in (None, "-"):
+        yield csv.writer(sys.stdout, delimiter=";")
+        sys.stdout.flush()
+        return
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        yield csv.writer(f, delimiter=";")
+
+
+# --- команди -------------------------------------------------------------------
+
+def cmd_revenue(args):
+    with _output(args.output) as writer:
+        if args.by == "day":
+            writer.writerow(["Дата", "Виручка, грн"])
+            for date, total in db.iter_total_by_day(args.date_from, args.date_to):
+                writer.writerow([date, f"{total:.2f}"])
+        elif args.by == "category":
+            writer.writerow(["Категорія", "Виручка, грн"])
+            for category, total in db.report_revenue_by_category(args.date_from, args.date_to):
+                writer.writerow([category, f"{total:.2f}"])
+        else:
+            writer.writerow(["ID", "Назва", "Категорія", "Продано, шт", "Виручка, грн"])
+            for pid, name, category, units, total in db.report_product_totals(
+                    args.date_from, args.date_to):
+                writer.writerow([pid, name, category, units, f"{total:.2f}"])
+
+
+def cmd_stock(args):
+    rows = db.iter_products_filtered(name_substr=args.name, category=args.category)
+    with _output(args.output) as writer:
+        writer.writerow(STOCK_HEADER)
+        for p in rows:
+            if args.low is not None and p.stock_qty > args.low:
+                continue
+            writer.writerow([
+                p.id, p.name, p.category, p.material or "", p.color or "",
+                p.width or "", p.height or "", p.depth or "",
+                f"{p.base_price:.2f}", p.stock_qty,
+            ])
+
+
+def cmd_sales(args):
+    rows = db.iter_sales_filtered(
+        name_substr=args.name, date_from=args.date_from, date_to=args.date_to,
+        customer_substr=args.customer, limit=args.limit,
+    )
+    with _output(args.output) as writer:
+        writer.writerow(["ID", "Дата", "Товар", "Категорія", "Кількість",
+                         "Ціна, грн", "Знижка, %", "Сума, грн", "Покупець"])
+        for s in rows:
+            writer.writerow([s.id, s.sale_date, s.product_name, s.category, s.quantity,
+                             f"{s.sale_price:.2f}", f"{s.discount_percent:.1f}",
+                             f"{s.total:.2f}", s.customer_name or ""])
+
+
+def _read_products_csv(path):
+    """Рядки товарів із CSV у форматі експорту залишків (колонка ID ігнорується)."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f, delimiter=";")
+        header = next(reader, None)
+        if header != STOCK_HEADER:
+            raise ValueError("Очікується CSV у форматі експорту залишків: "
+                             + ";".join(STOCK_HEADER))
+        for line_no, row in enumerate(reader, start=2):
+            if not any(row):
+                continue
+            try:
+                (_pid, name, category, material, color,
+                 width, height, depth, price, stock) = row
+                if not name.strip() or not category.strip():
+                    raise ValueError("назва та категорія обов'язкові")
+                yield (name.strip(), category.strip(),
+                       material.strip() or None, color.strip() or None,
+                       _optional_float(width), _optional_float(height),
+                       _optional_float(depth), db.Money.from_hryvnia(price),
+                       int(stock))
+            except ValueError as e:
+                raise ValueError(f"{path}, рядок {line_no}: {e}") from None
+
+
+def cmd_import(args):
+    rows = list(_read_products_csv(args.file))
+    if args.dry_run:
+        print(f"Перевірено товарів: {len(rows)} (без запису в БД)")
+        return
+    count = db.import_products(rows)
+    print(f"Імпортовано товарів: {count}")
+
+
+def cmd_backup(args):
+    for path in db.backup_database(args.dest):
+        print(path)
+
+
+def cmd_maintenance(args):
+    steps = tuple(step.strip() for step in args.steps.split(",") if step.strip())
+    results = maintenance.run_maintenance(steps, step_timeout=args.timeout,
+                                          full_vacuum=args.full_vacuum)
+    failed = False
+    for result in results:
+        extra = ", ".join(f"{key}={value}" for key, value in result.items()
+                          if key not in ("step", "status", "seconds"))
+        print(f"{result['step']}\t{result['status']}\t{result['seconds']:.3f}s\t{extra}")
+        failed = failed or result["status"] in ("error", "timeout")
+    if failed:
+        raise ValueError("не всі кроки обслуговування виконано")
+
+
+def cmd_stats(args):
+    for key, value in db.database_stats().items():
+        print(f"{key}\t{'' if value is None else value}")
+
+
+# --- розбір аргументів ---------------------------------------------------------
+
+def _add_period(parser):
+    parser.add_argument("--from", dest="date_from", type=_date, help="з дати (РРРР-ММ-ДД)")
+    parser.add_argument("--to", dest="date_to", type=_date, help="по дату включно")
+
+
+def _add_output(parser):
+    parser.add_argument("-o", "--output", help="файл CSV (типово stdout)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Облік продажу меблів: звіти та обслуговування БД."
+    )
+    parser.add_argument("--db", help="файл БД (або :memory:)")
+    parser.add_argument("--config", help="файл налаштувань (ini)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("revenue", help="виручка за днями, категоріями або товарами")
+    _add_period(p)
+    p.add_argument("--by", choices=("day", "category", "product"), default="day")
+    _add_output(p)
+    p.set_defaults(func=cmd_revenue)
+
+    p = sub.add_parser("stock", help="залишки товарів")
+    p.add_argument("--name", help="частина назви")
+    p.add_argument("--category", help="частина назви категорії")
+    p.add_argument("--low", type=int, metavar="N", help="лише товари із залишком ≤ N")
+    _add_output(p)
+    p.set_defaults(func=cmd_stock)
+
+    p = sub.add_parser("sales", help="продажі з фільтрами")
+    _add_period(p)
+    p.add_argument("--name", help="частина назви товару")
+    p.add_argument("--customer", help="покупець: частина імені або телефону")
+    p.add_argument("--limit", type=int, help="не більше N останніх продажів")
+    _add_output(p)
+    p.set_defaults(func=cmd_sales)
+
+    p = sub.add_parser("import", help="додати товари з CSV (формат експорту залишків)")
+    p.add_argument("file")
+    p.add_argument("--dry-run", action="store_true", help="лише перевірити файл")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("backup", help="резервна копія БД (і архівних років)")
+    p.add_argument("dest", help="шлях до файлу копії")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("maintenance", help="ANALYZE, PRAGMA optimize, checkpoint WAL, vacuum")
+    p.add_argument("--steps", default=",".join(maintenance.STEPS),
+                   help=f"кроки через кому (типово {','.join(maintenance.STEPS)})")
+    p.add_argument("--timeout", type=float, default=maintenance.STEP_TIMEOUT,
+                   help="обмеження часу на крок, с")
+    p.add_argument("--full-vacuum", action="store_true", help="примусовий повний VACUUM")
+    p.set_defaults(func=cmd_maintenance)
+
+    p = sub.add_parser("stats", help="статистика БД")
+    p.set_defaults(func=cmd_stats)
+
+    return parser
+
+
+def main(argv=None):
+    # Незалежно від локалі (cp1251, C/POSIX у cron) — див. опис модуля
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+    args = build_parser().parse_args(argv)
+    try:
+        config.configure(db_path=args.db, config_file=args.config)
+        db.init_db()
+        args.func(args)
+    except BrokenPipeError:
+        # stdout закрито (наприклад, `| head`) — це не помилка;
+        # перенаправлення не дає Python повторно впасти при закритті stdout
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"Помилка: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
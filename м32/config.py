@@ -0,0 +1,171 @@
+# config.py
+"""
+Налаштування підключення до БД: шлях до файлу та PRAGMA.
+
+Шлях до БД (перше знайдене):
+  1. configure(db_path=...) — наприклад, прапорець --db у cli.py;
+  2. змінна середовища FURNITURE_DB;
+  3. [database] path у файлі налаштувань;
+  4. furniture_sales.db поруч із цим модулем (а не в поточній теці).
+
+Файл налаштувань — configure(config_file=...), змінна FURNITURE_CONFIG
+або furniture.ini поруч із модулем:
+
+  [database]
+  path = furniture_sales.db      ; відносно теки файлу налаштувань
+  [pragmas]
+  journal_mode = wal
+  synchronous = normal
+  cache_size = -20000
+  busy_timeout = 5000
+
+Шлях ":memory:" — спільна БД у пам'яті (cache=shared): усі з'єднання
+процесу, зокрема фонові потоки LiveFilter, бачать ті самі дані, поки
+жива хоча б одна з них (її тримає цей модуль до reset()).
+"""
+import configparser
+import itertools
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+
+MODULE_DIR = Path(__file__).resolve().parent
+DEFAULT_DB_PATH = MODULE_DIR / "furniture_sales.db"
+DEFAULT_CONFIG_FILE = MODULE_DIR / "furniture.ini"
+MEMORY = ":memory:"
+
+_NAME_RE = re.compile(r"^[a-z_]+$")
+_VALUE_RE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+_db_path = None        # явне значення з configure()
+_pragmas = None        # явне значення з configure()
+_config_file = None
+_loaded = None         # (path, pragmas) з файлу налаштувань
+_memory_names = itertools.count(1)
+_memory_uri = None
+_memory_keeper = None
+
+
+def _read_config_file():
+    global _loaded
+    if _loaded is not None:
+        return _loaded
+    path = _config_file or os.environ.get("FURNITURE_CONFIG")
+    if path is None and DEFAULT_CONFIG_FILE.exists():
+        path = DEFAULT_CONFIG_FILE
+    db_path, pragmas = None, {}
+    if path is not None:
+        parser = configparser.ConfigParser()
+        if not parser.read(path, encoding="utf-8"):
+            raise ValueError(f"Не вдалося прочитати файл налаштувань: {path}")
+        raw = parser.get("database", "path", fallback=None)
+        if raw:
+            db_path = raw if raw == MEMORY else Path(path).resolve().parent / raw
+        if parser.has_section("pragmas"):
+            pragmas = dict(parser.items("pragmas"))
+    _loaded = (db_path, _check_pragmas(pragmas))
+    return _loaded
+
+
+def _check_pragmas(pragmas):
+    """PRAGMA підставляються в SQL текстом, тож перевіряємо імена та значення."""
+    checked = {}
+    for name, value in pragmas.items():
+        name, value = str(name).strip().lower(), str(value).strip()
+        if not _NAME_RE.match(name) or not _VALUE_RE.match(value):
+            raise ValueError(f"Недопустимий PRAGMA: {name} = {value}")
+        checked[name] = value
+    return checked
+
+
+def configure(db_path=None, pragmas=None, config_file=None):
+    """
+    Задати шлях до БД, PRAGMA та/або файл налаштувань для поточного процесу.
+    Не передані (None) параметри лишаються як були.
+    """
+    global _db_path, _pragmas, _config_file, _loaded
+    if config_file is not None:
+        _config_file = os.fspath(config_file)
+        _loaded = None
+    if pragmas is not None:
+        _pragmas = _check_pragmas(pragmas)
+    if db_path is not None:
+        _release_memory()
+        _db_path = db_path if db_path == MEMORY else Path(db_path).resolve()
+
+
+@contextmanager
+def using(db_path=None, pragmas=None):
+    """Тимчасово змінити налаштування (тести, бенчмарки); після блоку повертаються попередні."""
+    global _db_path, _pragmas, _memory_uri, _memory_keeper
+    saved = (_db_path, _pragmas, _memory_uri, _memory_keeper)
+    if pragmas is not None:
+        _pragmas = _check_pragmas(pragmas)
+    if db_path is not None:
+        _memory_uri = _memory_keeper = None  # зовнішня БД у пам'яті лишається живою
+        _db_path = db_path if db_path == MEMORY else Path(db_path).resolve()
+    try:
+        yield
+    finally:
+        if db_path is not None:
+            _release_memory()
+        _db_path, _pragmas, _memory_uri, _memory_keeper = saved
+
+
+def reset():
+    """Повернутися до налаштувань із середовища / файлу (і звільнити БД у пам'яті)."""
+    global _db_path, _pragmas, _config_file, _loaded
+    _release_memory()
+    _db_path = _pragmas = _config_file = _loaded = None
+
+
+def db_path():
+    """Поточний шлях до БД (Path) або ":memory:"."""
+    if _db_path is not None:
+        return _db_path
+    env = os.environ.get("FURNITURE_DB")
+    if env:
+        return env if env == MEMORY else Path(env).resolve()
+    return _read_config_file()[0] or DEFAULT_DB_PATH
+
+
+def is_memory():
+    return db_path() == MEMORY
+
+
+def pragmas():
+    """PRAGMA, що виконуються для кожного нового з'єднання."""
+    if _pragmas is not None:
+        return dict(_pragmas)
+    return dict(_read_config_file()[1])
+
+
+def _release_memory():
+    global _memory_uri, _memory_keeper
+    if _memory_keeper is not None:
+        _memory_keeper.close()
+    _memory_uri = _memory_keeper = None
+
+
+def _database_uri():
+    global _memory_uri, _memory_keeper
+    path = db_path()
+    if path != MEMORY:
+        return os.fspath(path)
+    if _memory_uri is None:
+        # Нове ім'я — нова порожня БД (наприклад, для кожного тесту)
+        _memory_uri = f"file:furniture_mem_{next(_memory_names)}?mode=memory&cache=shared"
+        _memory_keeper = sqlite3.connect(_memory_uri, uri=True, check_same_thread=False)
+    return _memory_uri
+
+
+def connect():
+    """Нове з'єднання з налаштованою БД і застосованими PRAGMA."""
+    # uri=True — щоб архівні БД можна було приєднати через ATTACH 'file:...?mode=ro'
+    conn = sqlite3.connect(_database_uri(), uri=True)
+    for name, value in pragmas().items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
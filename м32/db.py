@@ -1,24 +1,500 @@
 import sqlite3
 import datetime
+import json
 import random
+import re
+import unicodedata
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from pathlib import Path
 
-DB_NAME = "furniture_sales.db"
+import config
+import metrics
+
+# Скільки разів повторювати запис, якщо БД заблокована іншим процесом
+LOCK_RETRIES = 2
 
 
 def get_connection():
-    conn = sqlite3.connect(DB_NAME)
+    """З'єднання з БД за налаштуваннями config (шлях, PRAGMA)."""
+    conn = config.connect()
     conn.execute("PRAGMA foreign_keys = ON;")
     return conn
 
 
-def init_db():
-    """Створення таблиць для меблевого магазину, якщо їх ще немає."""
+def _has_table(conn, name):
+    """Чи існує таблиця (зокрема віртуальна) з такою назвою."""
+    cur = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    )
+    return cur.fetchone() is not None
+
+
+@contextmanager
+def _use_connection(conn=None):
+    """Використати передане з'єднання або відкрити нове (з комітом на виході)."""
+    if conn is not None:
+        yield conn
+        return
+    with get_connection() as own:
+        yield own
+
+
+# Скільки рядків читати за раз у генераторах iter_*
+FETCH_SIZE = 500
+
+
+class Money(int):
+    """
+    Сума в копійках. Ціни в БД зберігаються цілими копійками, тож суми
+    в SQL та Python точні; у гривнях сума лише показується:
+    str(Money(250050)) == "2500.50", f"{m:.2f}" форматує гривні.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_hryvnia(cls, value):
+        """Гривні (число або рядок, зокрема «1 234,50») -> Money. Money повертається як є."""
+        if isinstance(value, Money):
+            return value
+        try:
+            if isinstance(value, str):
+                value = value.strip().replace(" ", "").replace(",", ".")
+            amount = Decimal(str(value)) if isinstance(value, float) else Decimal(value)
+            return cls((amount * 100).to_integral_value(ROUND_HALF_UP))
+        except (InvalidOperation, ValueError, TypeError):
+            raise ValueError(f"Невірна сума: {value!r}") from None
+
+    @property
+    def hryvnia(self):
+        return Decimal(int(self)).scaleb(-2)
+
+    def __str__(self):
+        whole, kop = divmod(abs(int(self)), 100)
+        return f"{'-' if self < 0 else ''}{whole}.{kop:02d}"
+
+    def __repr__(self):
+        return f"Money({int(self)})"
+
+    def __format__(self, spec):
+        return format(self.hryvnia, spec) if spec else str(self)
+
+# Записи рядків. Це кортежі, тож старий код із позиційним розпакуванням
+# і індексами (row[1]) працює без змін.
+ProductRow = namedtuple(
+    "ProductRow",
+    "id name category material color width height depth base_price stock_qty",
+)
+SaleRow = namedtuple(
+    "SaleRow",
+    "id sale_date product_name category quantity sale_price "
+    "discount_percent total customer_name",
+)
+
+
+def _product_row(row):
+    return ProductRow(*row[:8], Money(row[8]), row[9])
+
+
+def _sale_row(row):
+    return SaleRow(*row[:5], Money(row[5]), row[6], Money(row[7]), row[8])
+
+
+def _iter_rows(cur, make=None, size=FETCH_SIZE):
+    """Читати результат курсора порціями fetchmany (пам'ять не росте з кількістю рядків)."""
+    while True:
+        rows = cur.fetchmany(size)
+        if not rows:
+            return
+        if make is not None:
+            rows = map(make, rows)
+        yield from rows
+
+
+# Таблиці, кількість рядків яких віддається в метриках
+_METRIC_TABLES = ("products", "sales", "customers", "logs")
+
+
+@metrics.register_collector
+def _collect_db_stats():
+    """Розмір файлів БД та кількість рядків у таблицях (при кожному зборі метрик)."""
+    samples = []
+    for suffix, kind in (("", "db"), ("-wal", "wal")):
+        if config.is_memory():
+            break
+        path = f"{config.db_path()}{suffix}"
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        samples.append(("furniture_db_file_bytes", "gauge",
+                        "Розмір файлу БД / WAL, байти.", {"file": kind}, size))
     with get_connection() as conn:
-        cur = conn.cursor()
+        for table in _METRIC_TABLES:
+            if not _has_table(conn, table):
+                continue
+            count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            samples.append(("furniture_table_rows", "gauge",
+                            "Кількість рядків у таблиці.", {"table": table}, count))
+    return samples
+
+
+# Версія схеми БД (PRAGMA user_version). Збільшується з кожною міграцією.
+SCHEMA_VERSION = 9
+
+# Версія схеми архівних файлів років (archive_partitions.version)
+ARCHIVE_VERSION = 3
+
+
+def _migrate_v1(cur):
+    """Базова схема: товари, продажі, журнал."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        category TEXT NOT NULL,
+        material TEXT,
+        color TEXT,
+        width REAL,
+        height REAL,
+        depth REAL,
+        base_price REAL NOT NULL CHECK(base_price >= 0),
+        stock_qty INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL CHECK(quantity > 0),
+        sale_price REAL NOT NULL CHECK(sale_price >= 0),
+        discount_percent REAL NOT NULL DEFAULT 0,
+        sale_date TEXT NOT NULL,
+        customer_name TEXT,
+        FOREIGN KEY (product_id) REFERENCES products(id)
+    );
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts TEXT NOT NULL,
+        user TEXT,
+        action TEXT NOT NULL,
+        details TEXT
+    );
+    """)
 
-   
+    # Індекси для сортування продажів за датою та перевірки в delete_product
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(sale_date, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sales_product ON sales(product_id)")
+
+
+def _migrate_v2(cur):
+    """Довідник покупців з нормалізованими іменами та пошуком за підрядком."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        name_norm TEXT NOT NULL UNIQUE,
+        phone TEXT
+    );
+    """)
+    cur.execute("ALTER TABLE sales ADD COLUMN customer_id INTEGER REFERENCES customers(id)")
+    # Покриваючий індекс: історія та сума покупок без читання таблиці sales
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sales_customer
+        ON sales(customer_id, sale_date, quantity, sale_price)
+    """)
+
+    # Триграмний FTS-індекс для пошуку за частиною імені / телефону
+    # (потрібен SQLite 3.34+ з FTS5; без нього пошук іде через LIKE по customers)
+    try:
         cur.execute("""
-        CREATE TABLE IF NOT EXISTS products (
+            CREATE VIRTUAL TABLE customers_fts USING fts5(
+                name_norm, phone,
+                content='customers', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError:
+        pass
+    else:
+        for sql in (
+            """CREATE TRIGGER customers_fts_ai AFTER INSERT ON customers BEGIN
+                INSERT INTO customers_fts(rowid, name_norm, phone)
+                VALUES (new.id, new.name_norm, new.phone);
+            END""",
+            """CREATE TRIGGER customers_fts_ad AFTER DELETE ON customers BEGIN
+                INSERT INTO customers_fts(customers_fts, rowid, name_norm, phone)
+                VALUES ('delete', old.id, old.name_norm, old.phone);
+            END""",
+            """CREATE TRIGGER customers_fts_au AFTER UPDATE ON customers BEGIN
+                INSERT INTO customers_fts(customers_fts, rowid, name_norm, phone)
+                VALUES ('delete', old.id, old.name_norm, old.phone);
+                INSERT INTO customers_fts(rowid, name_norm, phone)
+                VALUES (new.id, new.name_norm, new.phone);
+            END""",
+        ):
+            cur.execute(sql)
+
+    cur.execute("""
+    CREATE VIEW IF NOT EXISTS customer_ltv AS
+    SELECT c.id,
+           c.name,
+           c.phone,
+           COUNT(s.customer_id) AS purchases,
+           COALESCE(SUM(s.quantity), 0) AS units,
+           COALESCE(SUM(s.quantity * s.sale_price), 0) AS lifetime_value,
+           MIN(s.sale_date) AS first_purchase,
+           MAX(s.sale_date) AS last_purchase
+    FROM customers c
+    LEFT JOIN sales s ON s.customer_id = c.id
+    GROUP BY c.id
+    """)
+
+    # Перенесення покупців з існуючих продажів
+    cur.connection.create_function(
+        "normalize_customer", 1, normalize_customer_name, deterministic=True
+    )
+    cur.execute("""
+        INSERT OR IGNORE INTO customers (name, name_norm)
+        SELECT TRIM(customer_name), normalize_customer(customer_name)
+        FROM sales
+        WHERE normalize_customer(customer_name) IS NOT NULL
+        ORDER BY id
+    """)
+    cur.execute("""
+        UPDATE sales
+        SET customer_id = (SELECT c.id FROM customers c
+                           WHERE c.name_norm = normalize_customer(sales.customer_name))
+        WHERE customer_name IS NOT NULL
+    """)
+
+
+def _migrate_v3(cur):
+    """Структурований журнал: об'єкт події, JSON-дані та індекси для пошуку."""
+    cur.execute("ALTER TABLE logs ADD COLUMN entity_type TEXT")
+    cur.execute("ALTER TABLE logs ADD COLUMN entity_id INTEGER")
+    cur.execute("ALTER TABLE logs ADD COLUMN payload TEXT")
+
+    # Усі індекси закінчуються на ts (+ неявний id), тож вибірка
+    # «ORDER BY ts DESC, id DESC» іде по індексу без сортування
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs(ts)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_action ON logs(action, ts)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_user ON logs(user, ts)")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_logs_entity
+        ON logs(entity_type, entity_id, ts)
+    """)
+
+    # Старі записи: id товару витягується з рядка details
+    cur.execute("""
+        UPDATE logs
+        SET entity_type = 'product',
+            entity_id = CAST(substr(details, 12) AS INTEGER)
+        WHERE action = 'add_sale' AND details LIKE 'product_id=%'
+    """)
+    cur.execute("""
+        UPDATE logs
+        SET entity_type = 'product',
+            entity_id = CAST(substr(details, 4) AS INTEGER)
+        WHERE action IN ('update_product', 'delete_product')
+          AND details LIKE 'id=%'
+    """)
+
+
+def _migrate_v4(cur):
+    """Покриваючий індекс для агрегації виручки за датами (звіти, графіки)."""
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sales_date_amount
+        ON sales(sale_date, quantity, sale_price)
+    """)
+
+
+# Тригери синхронізації products_dims з products (перестворюються в міграції v8)
+_PRODUCTS_DIMS_TRIGGERS = (
+    """CREATE TRIGGER products_dims_ai AFTER INSERT ON products
+    WHEN new.width IS NOT NULL AND new.height IS NOT NULL AND new.depth IS NOT NULL
+    BEGIN
+        INSERT INTO products_dims
+        VALUES (new.id, new.width, new.width, new.height, new.height,
+                new.depth, new.depth);
+    END""",
+    """CREATE TRIGGER products_dims_au AFTER UPDATE OF width, height, depth ON products
+    BEGIN
+        DELETE FROM products_dims WHERE id = old.id;
+        INSERT INTO products_dims
+        SELECT new.id, new.width, new.width, new.height, new.height,
+               new.depth, new.depth
+        WHERE new.width IS NOT NULL AND new.height IS NOT NULL
+          AND new.depth IS NOT NULL;
+    END""",
+    """CREATE TRIGGER products_dims_ad AFTER DELETE ON products
+    BEGIN
+        DELETE FROM products_dims WHERE id = old.id;
+    END""",
+)
+
+
+def _migrate_v5(cur):
+    """R*Tree-індекс розмірів товарів (Ш×В×Г), синхронізований тригерами."""
+    try:
+        cur.execute("""
+            CREATE VIRTUAL TABLE products_dims USING rtree(
+                id, min_w, max_w, min_h, max_h, min_d, max_d
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite без R*Tree — фільтр за розмірами працює по колонках products
+        return
+
+    for sql in _PRODUCTS_DIMS_TRIGGERS:
+        cur.execute(sql)
+
+    cur.execute("""
+        INSERT INTO products_dims
+        SELECT id, width, width, height, height, depth, depth
+        FROM products
+        WHERE width IS NOT NULL AND height IS NOT NULL AND depth IS NOT NULL
+    """)
+
+
+def _migrate_v6(cur):
+    """Архів продажів закритих років в окремих файлах БД."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS archive_partitions (
+        year INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        date_from TEXT NOT NULL,
+        date_to TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        archived_at TEXT NOT NULL
+    );
+    """)
+    # Для delete_product: чи є продажі товару в архіві, без ATTACH
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS archived_products (
+        product_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        PRIMARY KEY (product_id, year)
+    ) WITHOUT ROWID;
+    """)
+    # Підсумки покупців по архіву: сума покупок без читання архівних файлів
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS archived_customer_totals (
+        customer_id INTEGER PRIMARY KEY,
+        purchases INTEGER NOT NULL,
+        units INTEGER NOT NULL,
+        total REAL NOT NULL,
+        first_purchase TEXT NOT NULL,
+        last_purchase TEXT NOT NULL
+    );
+    """)
+
+    cur.execute("DROP VIEW IF EXISTS customer_ltv")
+    cur.execute("""
+    CREATE VIEW customer_ltv AS
+    SELECT c.id,
+           c.name,
+           c.phone,
+           COUNT(s.customer_id) + COALESCE(a.purchases, 0) AS purchases,
+           COALESCE(SUM(s.quantity), 0) + COALESCE(a.units, 0) AS units,
+           COALESCE(SUM(s.quantity * s.sale_price), 0) + COALESCE(a.total, 0)
+               AS lifetime_value,
+           COALESCE(a.first_purchase, MIN(s.sale_date)) AS first_purchase,
+           COALESCE(MAX(s.sale_date), a.last_purchase) AS last_purchase
+    FROM customers c
+    LEFT JOIN archived_customer_totals a ON a.customer_id = c.id
+    LEFT JOIN sales s ON s.customer_id = c.id
+    GROUP BY c.id
+    """)
+
+
+def _migrate_v7(cur):
+    """
+    Знижка (і товар) у покриваючих індексах продажів: підсумки sales_summary
+    та звіти за категоріями / товарами за період без читання таблиці.
+    """
+    cur.execute("DROP INDEX IF EXISTS idx_sales_date_amount")
+    cur.execute("""
+        CREATE INDEX idx_sales_date_amount
+        ON sales(sale_date, quantity, sale_price, discount_percent, product_id)
+    """)
+    cur.execute("DROP INDEX IF EXISTS idx_sales_customer")
+    cur.execute("""
+        CREATE INDEX idx_sales_customer
+        ON sales(customer_id, sale_date, quantity, sale_price, discount_percent)
+    """)
+
+
+# Індекси таблиці sales (основної та архівних) у поточному вигляді
+_SALES_INDEXES = (
+    "idx_sales_date ON sales(sale_date, id)",
+    "idx_sales_product ON sales(product_id)",
+    "idx_sales_customer ON sales(customer_id, sale_date, quantity, sale_price, discount_percent)",
+    "idx_sales_date_amount ON sales(sale_date, quantity, sale_price, discount_percent, product_id)",
+)
+
+# Гроші зберігаються в копійках: лише цілі, не від'ємні
+_MONEY_CHECK = "CHECK(typeof({0}) = 'integer' AND {0} >= 0)"
+
+_SALES_TABLE = f"""
+    CREATE TABLE {{name}} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL CHECK(quantity > 0),
+        sale_price INTEGER NOT NULL {_MONEY_CHECK.format("sale_price")},
+        discount_percent REAL NOT NULL DEFAULT 0,
+        sale_date TEXT NOT NULL,
+        customer_name TEXT,
+        customer_id INTEGER REFERENCES customers(id),
+        FOREIGN KEY (product_id) REFERENCES products(id)
+    )
+"""
+
+# sales в архівному файлі року. Без REFERENCES: товари й покупці — в основній
+# БД. PRIMARY KEY (id) робить повторне перенесення року ідемпотентним.
+_ARCHIVE_SALES_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {{name}} (
+        id INTEGER PRIMARY KEY,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL CHECK(quantity > 0),
+        sale_price INTEGER NOT NULL {_MONEY_CHECK.format("sale_price")},
+        discount_percent REAL NOT NULL DEFAULT 0,
+        sale_date TEXT NOT NULL,
+        customer_name TEXT,
+        customer_id INTEGER
+    )
+"""
+
+
+def _rebuild_table(cur, table, create_sql, columns, select_sql):
+    """
+    Перебудувати таблицю з новими типами колонок (CREATE нової, копіювання,
+    DROP старої, перейменування). Лічильник AUTOINCREMENT зберігається;
+    індекси й тригери старої таблиці зникають разом із нею.
+    """
+    seq = cur.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    cur.execute(create_sql.format(name=f"{table}_new"))
+    cur.execute(f"INSERT INTO {table}_new ({columns}) SELECT {select_sql} FROM {table}")
+    cur.execute(f"DROP TABLE {table}")
+    cur.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    if seq is not None:
+        cur.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?",
+                    (seq[0], table))
+
+
+def _migrate_v8(cur):
+    """
+    Гроші в цілих копійках (INTEGER): ціни товарів і продажів та суми
+    архівних покупців. Суми в SQL стають точними й рахуються без float.
+    Архівні файли років переводяться окремо — _migrate_archives().
+    """
+    # Подання посилається на sales і заважає перейменуванню таблиць
+    cur.execute("DROP VIEW IF EXISTS customer_ltv")
+
+    _rebuild_table(cur, "products", f"""
+        CREATE TABLE {{name}} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
             category TEXT NOT NULL,
@@ -27,53 +503,170 @@ def init_db():
             width REAL,
             height REAL,
             depth REAL,
-            base_price REAL NOT NULL CHECK(base_price >= 0),
+            base_price INTEGER NOT NULL {_MONEY_CHECK.format("base_price")},
             stock_qty INTEGER NOT NULL DEFAULT 0
-        );
-        """)
+        )
+    """, "id, name, category, material, color, width, height, depth, base_price, stock_qty",
+        "id, name, category, material, color, width, height, depth, "
+        "CAST(ROUND(base_price * 100) AS INTEGER), stock_qty")
+    if _has_table(cur.connection, "products_dims"):
+        for sql in _PRODUCTS_DIMS_TRIGGERS:
+            cur.execute(sql)
 
-  
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS sales (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER NOT NULL,
-            quantity INTEGER NOT NULL CHECK(quantity > 0),
-            sale_price REAL NOT NULL CHECK(sale_price >= 0),
-            discount_percent REAL NOT NULL DEFAULT 0,
-            sale_date TEXT NOT NULL,
-            customer_name TEXT,
-            FOREIGN KEY (product_id) REFERENCES products(id)
-        );
-        """)
+    _rebuild_table(cur, "sales", _SALES_TABLE, _SALES_COLUMNS,
+                   _SALES_COLUMNS.replace("sale_price",
+                                          "CAST(ROUND(sale_price * 100) AS INTEGER)"))
+    for index in _SALES_INDEXES:
+        cur.execute(f"CREATE INDEX {index}")
 
-        
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TEXT NOT NULL,
-            user TEXT,
-            action TEXT NOT NULL,
-            details TEXT
-        );
-        """)
+    _rebuild_table(cur, "archived_customer_totals", f"""
+        CREATE TABLE {{name}} (
+            customer_id INTEGER PRIMARY KEY,
+            purchases INTEGER NOT NULL,
+            units INTEGER NOT NULL,
+            total INTEGER NOT NULL {_MONEY_CHECK.format("total")},
+            first_purchase TEXT NOT NULL,
+            last_purchase TEXT NOT NULL
+        )
+    """, "customer_id, purchases, units, total, first_purchase, last_purchase",
+        "customer_id, purchases, units, CAST(ROUND(total * 100) AS INTEGER), "
+        "first_purchase, last_purchase")
 
-        conn.commit()
+    cur.execute("ALTER TABLE archive_partitions ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
 
+    cur.execute("""
+    CREATE VIEW customer_ltv AS
+    SELECT c.id,
+           c.name,
+           c.phone,
+           COUNT(s.customer_id) + COALESCE(a.purchases, 0) AS purchases,
+           COALESCE(SUM(s.quantity), 0) + COALESCE(a.units, 0) AS units,
+           COALESCE(SUM(s.quantity * s.sale_price), 0) + COALESCE(a.total, 0)
+               AS lifetime_value,
+           COALESCE(a.first_purchase, MIN(s.sale_date)) AS first_purchase,
+           COALESCE(MAX(s.sale_date), a.last_purchase) AS last_purchase
+    FROM customers c
+    LEFT JOIN archived_customer_totals a ON a.customer_id = c.id
+    LEFT JOIN sales s ON s.customer_id = c.id
+    GROUP BY c.id
+    """)
 
 
+def _migrate_v9(cur):
+    """
+    queue_id продажів з локальної черги (sale_queue.py): унікальний, тож
+    повторне відтворення черги не створює дублікатів.
+    """
+    cur.execute("ALTER TABLE sales ADD COLUMN queue_id TEXT")
+    cur.execute("""
+        CREATE UNIQUE INDEX idx_sales_queue ON sales(queue_id)
+        WHERE queue_id IS NOT NULL
+    """)
 
-def add_log(action, details="", user="operator"):
-    """Записати подію в журнал."""
+
+def _migrate_archives(conn):
+    """
+    Перевести архівні файли зі старою схемою (version < ARCHIVE_VERSION)
+    на поточну: ціни в копійках (v2), PRIMARY KEY (id) без дублікатів
+    продажів (v3) та актуальні індекси. ATTACH не можна виконати
+    в транзакції, тож кожен архів оновлюється окремо після init_db.
+    """
+    if not _has_table(conn, "archive_partitions"):
+        return
+    stale = conn.execute(
+        "SELECT year, path, version FROM archive_partitions WHERE version < ? ORDER BY year",
+        (ARCHIVE_VERSION,),
+    ).fetchall()
+    for year, file_name, version in stale:
+        if not _main_db_path(conn).with_name(file_name).exists():
+            continue  # відсутній файл — помилку покаже перший запит до архіву
+        schema = _attach_archive(conn, year, file_name, readonly=False)
+        try:
+            cur = conn.cursor()
+            cur.execute("BEGIN")
+            cur.execute(f"ALTER TABLE {schema}.sales RENAME TO sales_old")
+            cur.execute(_ARCHIVE_SALES_TABLE.format(name=f"{schema}.sales"))
+            columns = _SALES_COLUMNS
+            if version < 2:
+                columns = columns.replace("sale_price",
+                                          "CAST(ROUND(sale_price * 100) AS INTEGER)")
+            # Рядки, скопійовані двічі перерваним archive_year, лишаються один раз
+            cur.execute(f"""
+                INSERT OR IGNORE INTO {schema}.sales ({_SALES_COLUMNS})
+                SELECT {columns} FROM {schema}.sales_old
+            """)
+            cur.execute(f"DROP TABLE {schema}.sales_old")
+            for index in _SALES_INDEXES:
+                cur.execute(f"CREATE INDEX {schema}.{index}")
+            cur.execute(f"""
+                UPDATE archive_partitions
+                SET version = ?, rows = (SELECT COUNT(*) FROM {schema}.sales)
+                WHERE year = ?
+            """, (ARCHIVE_VERSION, year))
+            conn.commit()
+        finally:
+            conn.execute(f"DETACH DATABASE {schema}")
+
+
+# (версія, функція міграції) — виконуються по черзі, починаючи з поточної версії
+_MIGRATIONS = [
+    (1, _migrate_v1),
+    (2, _migrate_v2),
+    (3, _migrate_v3),
+    (4, _migrate_v4),
+    (5, _migrate_v5),
+    (6, _migrate_v6),
+    (7, _migrate_v7),
+    (8, _migrate_v8),
+    (9, _migrate_v9),
+]
+
+
+@metrics.instrument
+def init_db():
+    """
+    Створення / оновлення схеми БД.
+    Якщо PRAGMA user_version уже актуальна, перевірки схеми пропускаються
+    (лишається один запит: чи всі архівні файли на поточній схемі).
+    """
     with get_connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            # Перебудова таблиць (v8) тимчасово лишає посилання FOREIGN KEY
+            # на видалену таблицю; id не змінюються, тож зв'язки зберігаються
+            conn.execute("PRAGMA foreign_keys = OFF")
+            cur = conn.cursor()
+            cur.execute("BEGIN")
+            for target, migrate in _MIGRATIONS:
+                if version < target:
+                    migrate(cur)
+            cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+            conn.execute("PRAGMA foreign_keys = ON")
+        _migrate_archives(conn)
+
+
+@metrics.instrument
+def add_log(action, details="", user="operator",
+            entity_type=None, entity_id=None, payload=None, conn=None):
+    """
+    Записати подію в журнал.
+    entity_type / entity_id — об'єкт події (наприклад, 'product', 17),
+    payload — словник з деталями, зберігається як JSON.
+    """
+    with _use_connection(conn) as conn:
         cur = conn.cursor()
         ts = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        if payload is not None:
+            payload = json.dumps(payload, ensure_ascii=False)
         cur.execute("""
-            INSERT INTO logs (ts, user, action, details)
-            VALUES (?, ?, ?, ?)
-        """, (ts, user, action, details))
-        conn.commit()
+            INSERT INTO logs (ts, user, action, details,
+                              entity_type, entity_id, payload)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (ts, user, action, details, entity_type, entity_id, payload))
 
 
+@metrics.instrument
 def list_logs(limit=200):
     """Отримати останні події журналу."""
     with get_connection() as conn:
@@ -87,8 +680,79 @@ def list_logs(limit=200):
         return cur.fetchall()
 
 
+@metrics.instrument
+def search_logs(date_from=None, date_to=None, action=None, user=None,
+                entity_type=None, entity_id=None, after=None, limit=200):
+    """
+    Пошук у журналі з посторінковою вибіркою за ключем (keyset).
+    after — (ts, id) останнього рядка попередньої сторінки.
+    Повертає рядки (id, ts, user, action, entity_type, entity_id, details, payload),
+    від новіших до старіших.
+    """
+    sql = """
+        SELECT id, ts, user, action, entity_type, entity_id, details, payload
+        FROM logs
+        WHERE 1=1
+    """
+    params = []
+    if date_from:
+        sql += " AND ts >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND ts < date(?, '+1 day')"
+        params.append(date_to)
+    if action:
+        sql += " AND action = ?"
+        params.append(action)
+    if user:
+        sql += " AND user = ?"
+        params.append(user)
+    if entity_type:
+        sql += " AND entity_type = ?"
+        params.append(entity_type)
+    if entity_id is not None:
+        sql += " AND entity_id = ?"
+        params.append(entity_id)
+    if after is not None:
+        sql += " AND (ts, id) < (?, ?)"
+        params.extend(after)
+    sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+    params.append(limit)
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return cur.fetchall()
 
 
+@metrics.instrument
+def list_log_values(column):
+    """
+    Унікальні значення колонки журналу (action / user / entity_type) для
+    фільтрів. Кожна колонка — перша в своєму індексі, тож значення
+    перебираються стрибками по індексу (MIN(col) WHERE col > попереднє):
+    кілька пошуків у B-дереві на значення замість читання всього індексу.
+    """
+    if column not in ("action", "user", "entity_type"):
+        raise ValueError(f"Невідома колонка журналу: {column}")
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            WITH RECURSIVE v(value) AS (
+                SELECT MIN({column}) FROM logs
+                UNION ALL
+                SELECT (SELECT MIN({column}) FROM logs WHERE {column} > v.value)
+                FROM v
+                WHERE v.value IS NOT NULL
+            )
+            SELECT value FROM v WHERE value IS NOT NULL
+        """)
+        return [row[0] for row in cur.fetchall()]
+
+
+
+
+@metrics.instrument
 def seed_test_data():
     """
     Заповнити БД тестовими товарами (близько 50 позицій меблів),
@@ -138,7 +802,8 @@ def seed_test_data():
             width = random.choice([60, 80, 100, 120, 140, 160, 180, 200])
             height = random.choice([40, 50, 75, 90, 200])
             depth = random.choice([35, 40, 45, 60])
-            base_price = random.choice([2500, 3200, 4500, 5200, 6300, 7800, 9100])
+            base_price = Money.from_hryvnia(
+                random.choice([2500, 3200, 4500, 5200, 6300, 7800, 9100]))
             stock_qty = random.randint(0, 20)
             products_data.append(
                 (name, cat, material, color, width, height, depth, base_price, stock_qty)
@@ -157,8 +822,11 @@ def seed_test_data():
 
 
 
+@metrics.instrument(retries=LOCK_RETRIES)
 def add_product(name, category, material, color,
                 width, height, depth, base_price, stock_qty):
+    """Додати товар; base_price — у гривнях (число / рядок) або Money."""
+    base_price = Money.from_hryvnia(base_price)
     with get_connection() as conn:
         cur = conn.cursor()
         cur.execute("""
@@ -168,12 +836,20 @@ def add_product(name, category, material, color,
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (name, category, material, color,
               width, height, depth, base_price, stock_qty))
+        product_id = cur.lastrowid
+        add_log("add_product", f"{name} ({category}), stock={stock_qty}",
+                entity_type="product", entity_id=product_id,
+                payload={"name": name, "category": category,
+                         "base_price": str(base_price), "stock_qty": stock_qty},
+                conn=conn)
         conn.commit()
-    add_log("add_product", f"{name} ({category}), stock={stock_qty}")
+    return product_id
 
 
+@metrics.instrument(retries=LOCK_RETRIES)
 def update_product(product_id, name, category, material, color,
                    width, height, depth, base_price, stock_qty):
+    base_price = Money.from_hryvnia(base_price)
     with get_connection() as conn:
         cur = conn.cursor()
         cur.execute("""
@@ -183,24 +859,35 @@ def update_product(product_id, name, category, material, color,
             WHERE id = ?
         """, (name, category, material, color,
               width, height, depth, base_price, stock_qty, product_id))
+        add_log("update_product", f"id={product_id}, {name} ({category}), stock={stock_qty}",
+                entity_type="product", entity_id=product_id,
+                payload={"name": name, "category": category,
+                         "base_price": str(base_price), "stock_qty": stock_qty},
+                conn=conn)
         conn.commit()
-    add_log("update_product", f"id={product_id}, {name} ({category}), stock={stock_qty}")
 
 
+@metrics.instrument(retries=LOCK_RETRIES)
 def delete_product(product_id):
     with get_connection() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM sales WHERE product_id = ?", (product_id,))
+        cur.execute("""
+            SELECT (SELECT COUNT(*) FROM sales WHERE product_id = ?)
+                 + (SELECT COUNT(*) FROM archived_products WHERE product_id = ?)
+        """, (product_id, product_id))
         sales_count = cur.fetchone()[0]
         if sales_count > 0:
             raise ValueError("Неможливо видалити товар: існують пов'язані продажі.")
         cur.execute("DELETE FROM products WHERE id = ?", (product_id,))
+        add_log("delete_product", f"id={product_id}",
+                entity_type="product", entity_id=product_id, conn=conn)
         conn.commit()
-    add_log("delete_product", f"id={product_id}")
 
 
-def list_products():
-    with get_connection() as conn:
+@metrics.instrument
+def iter_products(conn=None):
+    """Усі товари по одному ProductRow (порціями по FETCH_SIZE)."""
+    with _use_connection(conn) as conn:
         cur = conn.cursor()
         cur.execute("""
             SELECT id, name, category, material, color,
@@ -208,39 +895,491 @@ def list_products():
             FROM products
             ORDER BY id
         """)
+        yield from _iter_rows(cur, _product_row)
+
+
+def list_products(conn=None):
+    return list(iter_products(conn=conn))
+
+
+# --- Архів продажів за роками -------------------------------------------------
+#
+# Продажі закритих років переносяться в окремі файли <БД>_<рік>.db поруч
+# із основною БД. Запити до продажів отримують джерело через _sales_source():
+# основна таблиця плюс лише ті архівні роки, що перетинаються з діапазоном
+# дат; архіви приєднуються через ATTACH у режимі лише для читання.
+
+# Колонки, спільні для основної та архівних таблиць sales
+_SALES_COLUMNS = ("id, product_id, quantity, sale_price, discount_percent, "
+                  "sale_date, customer_name, customer_id")
+
+
+def _main_db_path(conn):
+    for _seq, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return Path(path) if path else None
+    return None
+
+
+def _archive_path(conn, year):
+    main_path = _main_db_path(conn)
+    if main_path is None:
+        raise ValueError("Архів недоступний для БД у пам'яті.")
+    return main_path.with_name(f"{main_path.stem}_{year}.db")
+
+
+def _attach_archive(conn, year, file_name, readonly=True):
+    """Приєднати архів року (якщо ще не приєднаний) і повернути ім'я схеми."""
+    schema = f"sales_{year}"
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    if schema not in attached:
+        path = _main_db_path(conn).with_name(file_name)
+        if readonly:
+            if not path.exists():
+                raise ValueError(f"Не знайдено архівний файл: {path}")
+            uri = path.resolve().as_uri() + "?mode=ro"
+        else:
+            uri = path.resolve().as_uri() + "?mode=rwc"
+        conn.execute("ATTACH DATABASE ? AS " + schema, (uri,))
+    return schema
+
+
+def _sales_source(conn, date_from=None, date_to=None):
+    """
+    Вираз для FROM з продажами за період: main.sales або
+    (main.sales UNION ALL архівні роки, що перетинаються з періодом).
+    SQLite проштовхує умови WHERE у кожну гілку UNION ALL, тож індекси
+    працюють і в архівах. Приєднати можна не більше SQLITE_LIMIT_ATTACHED
+    баз; решта архівів періоду приєднується по одному, їхні продажі за
+    період копіюються в тимчасові таблиці, і архів одразу від'єднується.
+    """
+    if not _has_table(conn, "archive_partitions"):
+        return "main.sales"
+    sql = "SELECT year, path FROM archive_partitions WHERE 1=1"
+    params = []
+    if date_from:
+        sql += " AND date_to >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND date_from <= ?"
+        params.append(date_to)
+    partitions = conn.execute(sql + " ORDER BY year DESC", params).fetchall()
+    if not partitions:
+        return "main.sales"
+
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) if hasattr(conn, "getlimit") else 10
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")} - {"main", "temp"}
+    # Уже приєднані архіви — першими; один слот лишається для почергового читання
+    partitions.sort(key=lambda p: f"sales_{p[0]}" not in attached)
+    free = limit - len(attached - {f"sales_{year}" for year, _ in partitions})
+    direct = partitions if len(partitions) <= free else partitions[:max(free - 1, 0)]
+
+    selects = [f"SELECT {_SALES_COLUMNS} FROM main.sales"]
+    for year, file_name in direct:
+        schema = _attach_archive(conn, year, file_name)
+        selects.append(f"SELECT {_SALES_COLUMNS} FROM {schema}.sales")
+    for year, file_name in partitions[len(direct):]:
+        table = _copy_archive(conn, year, file_name, date_from, date_to)
+        selects.append(f"SELECT {_SALES_COLUMNS} FROM {table}")
+    return "(" + " UNION ALL ".join(selects) + ")"
+
+
+def _copy_archive(conn, year, file_name, date_from=None, date_to=None):
+    """
+    Скопіювати продажі архіву року за період у temp.archived_sales_<рік>
+    і від'єднати архів. CREATE TABLE ... AS не відкриває транзакцію, тож
+    DETACH можливий одразу. Повертає ім'я тимчасової таблиці.
+    """
+    table = f"temp.archived_sales_{year}"
+    where, params = "1=1", []
+    if date_from:
+        where += " AND sale_date >= ?"
+        params.append(date_from)
+    if date_to:
+        where += " AND sale_date <= ?"
+        params.append(date_to)
+    schema = _attach_archive(conn, year, file_name)
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"""
+            CREATE TABLE {table} AS
+            SELECT {_SALES_COLUMNS} FROM {schema}.sales WHERE {where}
+        """, params)
+    finally:
+        conn.execute(f"DETACH DATABASE {schema}")
+    return table
+
+
+@metrics.instrument
+def list_archive_partitions():
+    """Архівні роки: (рік, файл, перша дата, остання дата, рядків, коли архівовано)."""
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT year, path, date_from, date_to, rows, archived_at
+            FROM archive_partitions
+            ORDER BY year
+        """)
         return cur.fetchall()
 
 
-def list_products_filtered(name_substr=None, category=None,
-                           price_min=None, price_max=None):
-    """Повертає товари з фільтрацією по назві / категорії / ціні."""
+@metrics.instrument(retries=LOCK_RETRIES)
+def archive_year(year):
+    """
+    Перенести продажі закритого року year в архівний файл.
+    Повторний запуск дописує в архів продажі року, що з'явилися пізніше.
+    Повертає кількість перенесених рядків.
+    """
+    year = int(year)
+    if year >= datetime.date.today().year:
+        raise ValueError("Архівувати можна лише закриті (минулі) роки.")
+    date_from, date_to = f"{year}-01-01", f"{year}-12-31"
+
     with get_connection() as conn:
+        file_name = _archive_path(conn, year).name
         cur = conn.cursor()
-        sql = """
+        cur.execute("SELECT COUNT(*) FROM sales WHERE sale_date BETWEEN ? AND ?",
+                    (date_from, date_to))
+        moved = cur.fetchone()[0]
+        if moved == 0:
+            return 0
+
+        schema = _attach_archive(conn, year, file_name, readonly=False)
+        cur.execute(_ARCHIVE_SALES_TABLE.format(name=f"{schema}.sales"))
+        for index in _SALES_INDEXES:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {schema}.{index}")
+
+        cur.execute("BEGIN")
+        # Транзакція з приєднаною БД у режимі WAL не атомарна: якщо архів
+        # зафіксовано, а видалення з main.sales — ні, повтор не дублює рядки
+        cur.execute(f"""
+            INSERT OR IGNORE INTO {schema}.sales ({_SALES_COLUMNS})
+            SELECT {_SALES_COLUMNS} FROM main.sales
+            WHERE sale_date BETWEEN ? AND ?
+        """, (date_from, date_to))
+        cur.execute("""
+            INSERT OR IGNORE INTO archived_products (product_id, year)
+            SELECT DISTINCT product_id, ? FROM main.sales
+            WHERE sale_date BETWEEN ? AND ?
+        """, (year, date_from, date_to))
+        cur.execute("""
+            INSERT INTO archived_customer_totals AS a
+                (customer_id, purchases, units, total, first_purchase, last_purchase)
+            SELECT customer_id, COUNT(*), SUM(quantity), SUM(quantity * sale_price),
+                   MIN(sale_date), MAX(sale_date)
+            FROM main.sales
+            WHERE sale_date BETWEEN ? AND ? AND customer_id IS NOT NULL
+            GROUP BY customer_id
+            ON CONFLICT (customer_id) DO UPDATE SET
+                purchases = a.purchases + excluded.purchases,
+                units = a.units + excluded.units,
+                total = a.total + excluded.total,
+                first_purchase = MIN(a.first_purchase, excluded.first_purchase),
+                last_purchase = MAX(a.last_purchase, excluded.last_purchase)
+        """, (date_from, date_to))
+        cur.execute("DELETE FROM main.sales WHERE sale_date BETWEEN ? AND ?",
+                    (date_from, date_to))
+
+        cur.execute(f"SELECT MIN(sale_date), MAX(sale_date), COUNT(*) FROM {schema}.sales")
+        first, last, rows = cur.fetchone()
+        archived_at = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        cur.execute("""
+            INSERT OR REPLACE INTO archive_partitions
+                (year, path, date_from, date_to, rows, archived_at, version)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (year, file_name, first, last, rows, archived_at, ARCHIVE_VERSION))
+        add_log("archive_year", f"year={year}, rows={moved}, file={file_name}",
+                payload={"year": year, "rows": moved, "file": file_name},
+                conn=conn)
+        conn.commit()
+        conn.execute(f"DETACH DATABASE {schema}")
+
+    return moved
+
+
+def archive_closed_years(keep_years=1):
+    """
+    Архівувати всі роки, старші за keep_years останніх (1 — лише поточний
+    рік лишається в основній БД). Повертає {рік: перенесено рядків}.
+    """
+    first_kept = datetime.date.today().year - keep_years + 1
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT DISTINCT CAST(substr(sale_date, 1, 4) AS INTEGER)
+            FROM sales
+            WHERE sale_date < ?
+        """, (f"{first_kept}-01-01",))
+        years = [row[0] for row in cur.fetchall()]
+    return {year: archive_year(year) for year in years}
+
+
+# (колонка products, колонки мін./макс. у products_dims)
+_DIMENSIONS = (
+    ("width", "min_w", "max_w"),
+    ("height", "min_h", "max_h"),
+    ("depth", "min_d", "max_d"),
+)
+
+
+def _products_filter(name_substr=None, category=None,
+                     price_min=None, price_max=None,
+                     width_min=None, width_max=None,
+                     height_min=None, height_max=None,
+                     depth_min=None, depth_max=None, rtree=False):
+    """
+    Умова WHERE та параметри для фільтра товарів.
+    Діапазони розмірів (у см) спершу звужуються R*Tree-індексом
+    products_dims (якщо rtree=True), а потім перевіряються точно по колонках.
+    """
+    sql = "1=1"
+    params = []
+    if name_substr:
+        sql += " AND name LIKE ?"
+        params.append(f"%{name_substr}%")
+    if category:
+        sql += " AND category LIKE ?"
+        params.append(f"%{category}%")
+    if price_min is not None:
+        sql += " AND base_price >= ?"
+        params.append(Money.from_hryvnia(price_min))
+    if price_max is not None:
+        sql += " AND base_price <= ?"
+        params.append(Money.from_hryvnia(price_max))
+
+    bounds = {
+        "width": (width_min, width_max),
+        "height": (height_min, height_max),
+        "depth": (depth_min, depth_max),
+    }
+    box_sql, box_params = [], []
+    for column, min_col, max_col in _DIMENSIONS:
+        low, high = bounds[column]
+        if low is not None:
+            sql += f" AND {column} >= ?"
+            params.append(low)
+            box_sql.append(f"{max_col} >= ?")
+            box_params.append(low)
+        if high is not None:
+            sql += f" AND {column} <= ?"
+            params.append(high)
+            box_sql.append(f"{min_col} <= ?")
+            box_params.append(high)
+    if rtree and box_sql:
+        sql += f" AND id IN (SELECT id FROM products_dims WHERE {' AND '.join(box_sql)})"
+        params.extend(box_params)
+    return sql, params
+
+
+@metrics.instrument
+def iter_products_filtered(name_substr=None, category=None,
+                           price_min=None, price_max=None,
+                           width_min=None, width_max=None,
+                           height_min=None, height_max=None,
+                           depth_min=None, depth_max=None, conn=None):
+    """
+    Товари (ProductRow) з фільтрацією по назві / категорії / ціні / розмірах.
+    «Вміщується в Ш×В×Г» — це width_max / height_max / depth_max.
+    """
+    with _use_connection(conn) as conn:
+        where, params = _products_filter(
+            name_substr, category, price_min, price_max,
+            width_min, width_max, height_min, height_max, depth_min, depth_max,
+            rtree=_has_table(conn, "products_dims"),
+        )
+        cur = conn.cursor()
+        cur.execute(f"""
             SELECT id, name, category, material, color,
                    width, height, depth, base_price, stock_qty
             FROM products
-            WHERE 1=1
-        """
-        params = []
-        if name_substr:
-            sql += " AND name LIKE ?"
-            params.append(f"%{name_substr}%")
-        if category:
-            sql += " AND category LIKE ?"
-            params.append(f"%{category}%")
-        if price_min is not None:
-            sql += " AND base_price >= ?"
-            params.append(price_min)
-        if price_max is not None:
-            sql += " AND base_price <= ?"
-            params.append(price_max)
-
-        sql += " ORDER BY id"
-        cur.execute(sql, params)
-        return cur.fetchall()
+            WHERE {where}
+            ORDER BY id
+        """, params)
+        yield from _iter_rows(cur, _product_row)
+
+
+def list_products_filtered(name_substr=None, category=None,
+                           price_min=None, price_max=None,
+                           width_min=None, width_max=None,
+                           height_min=None, height_max=None,
+                           depth_min=None, depth_max=None, conn=None):
+    return list(iter_products_filtered(
+        name_substr, category, price_min, price_max,
+        width_min, width_max, height_min, height_max, depth_min, depth_max,
+        conn=conn,
+    ))
+
+
+def _bulk_changes(price_percent=None, price_delta=None, stock_delta=None):
+    """Вирази нової ціни та залишку для масової зміни товарів."""
+    if price_percent is not None and price_delta is not None:
+        raise ValueError("Вкажіть зміну ціни або у відсотках, або в гривнях.")
+    if price_percent is None and price_delta is None and not stock_delta:
+        raise ValueError("Не вказано жодної зміни.")
+    if price_percent is not None:
+        price_sql = "CAST(ROUND(base_price * (100 + ?) / 100.0) AS INTEGER)"
+        price_params = [price_percent]
+    elif price_delta is not None:
+        price_sql, price_params = "base_price + ?", [Money.from_hryvnia(price_delta)]
+    else:
+        price_sql, price_params = "base_price", []
+    stock_sql, stock_params = "stock_qty + ?", [int(stock_delta or 0)]
+    return price_sql, price_params, stock_sql, stock_params
+
+
+@metrics.instrument
+def preview_bulk_update(price_percent=None, price_delta=None, stock_delta=None,
+                        conn=None, **filters):
+    """
+    Попередній перегляд масової зміни (нічого не записує).
+    filters — ті самі, що в list_products_filtered.
+    Рядки: (id, назва, категорія, стара ціна, нова ціна, старий залишок, новий залишок),
+    ціни — Money.
+    """
+    price_sql, price_params, stock_sql, stock_params = _bulk_changes(
+        price_percent, price_delta, stock_delta)
+    with _use_connection(conn) as conn:
+        where, params = _products_filter(**filters, rtree=_has_table(conn, "products_dims"))
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT id, name, category, base_price, {price_sql},
+                   stock_qty, {stock_sql}
+            FROM products
+            WHERE {where}
+            ORDER BY id
+        """, price_params + stock_params + params)
+        return [(pid, name, category, Money(old_price), Money(new_price), old_stock, new_stock)
+                for pid, name, category, old_price, new_price, old_stock, new_stock
+                in cur.fetchall()]
+
+
+@metrics.instrument(retries=LOCK_RETRIES)
+def bulk_update_products(price_percent=None, price_delta=None, stock_delta=None,
+                         **filters):
+    """
+    Змінити ціну (на price_percent % або на price_delta грн) та/або залишок
+    (на stock_delta шт.) усіх товарів, що відповідають фільтрам
+    list_products_filtered. Один UPDATE в одній транзакції та один запис
+    у журналі. Повертає кількість змінених товарів.
+    """
+    if price_delta is not None:
+        price_delta = Money.from_hryvnia(price_delta)
+    price_sql, price_params, stock_sql, stock_params = _bulk_changes(
+        price_percent, price_delta, stock_delta)
+    with get_connection() as conn:
+        where, params = _products_filter(**filters, rtree=_has_table(conn, "products_dims"))
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(f"""
+            SELECT SUM({price_sql} < 0), SUM({stock_sql} < 0)
+            FROM products
+            WHERE {where}
+        """, price_params + stock_params + params)
+        negative_price, negative_stock = cur.fetchone()
+        problems = []
+        if negative_price:
+            problems.append(f"від'ємна ціна у {negative_price} товарів")
+        if negative_stock:
+            problems.append(f"від'ємний залишок у {negative_stock} товарів")
+        if problems:
+            raise ValueError("Зміну не застосовано: " + ", ".join(problems) + ".")
+
+        cur.execute(f"""
+            UPDATE products
+            SET base_price = {price_sql}, stock_qty = {stock_sql}
+            WHERE {where}
+            RETURNING id
+        """, price_params + stock_params + params)
+        ids = sorted(row[0] for row in cur.fetchall())
+        if not ids:
+            return 0
+
+        changes = []
+        if price_percent is not None:
+            changes.append(f"ціна {price_percent:+g}%")
+        if price_delta is not None:
+            changes.append(f"ціна {'+' if price_delta >= 0 else ''}{price_delta} грн")
+        if stock_delta:
+            changes.append(f"залишок {stock_delta:+d}")
+        used_filters = {key: value for key, value in filters.items() if value is not None}
+        # Ціни в журналі — у гривнях, як price_delta (Money з UI — копійки)
+        for key in ("price_min", "price_max"):
+            if key in used_filters:
+                used_filters[key] = str(Money.from_hryvnia(used_filters[key]))
+        add_log("bulk_update_products",
+                f"count={len(ids)}, {', '.join(changes)}",
+                entity_type="product",
+                payload={"filters": used_filters, "price_percent": price_percent,
+                         "price_delta": None if price_delta is None else str(price_delta),
+                         "stock_delta": stock_delta,
+                         "count": len(ids), "ids": ids},
+                conn=conn)
+        conn.commit()
+    return len(ids)
+
+
+@metrics.instrument
+def nearest_products_by_size(width, height, depth, limit=10, conn=None, **filters):
+    """
+    Товари, найближчі за розміром до Ш×В×Г (евклідова відстань, см),
+    з урахуванням інших фільтрів list_products_filtered.
+
+    Пошук іде вікнами зростаючого радіуса навколо заданого розміру:
+    все, що лежить поза кубом радіуса r, віддалене більш ніж на r,
+    тож коли k-й найближчий кандидат не далі r, результат точний.
+    Повертає рядки товарів, до яких додано відстань.
+    """
+    target = (width, height, depth)
+    radius = 10.0
+    with _use_connection(conn) as conn:
+        while True:
+            rows = list_products_filtered(
+                **filters,
+                width_min=width - radius, width_max=width + radius,
+                height_min=height - radius, height_max=height + radius,
+                depth_min=depth - radius, depth_max=depth + radius,
+                conn=conn,
+            )
+            ranked = sorted(
+                (sum((a - b) ** 2 for a, b in zip(row[5:8], target)) ** 0.5, row)
+                for row in rows
+            )[:limit]
+            if len(ranked) == limit and ranked[-1][0] <= radius:
+                break
+            if radius > 100_000:  # усі товари з розмірами вже у вікні
+                break
+            radius = max(radius * 2, ranked[-1][0] if len(ranked) == limit else 0)
+        return [row + (round(dist, 1),) for dist, row in ranked]
+
+
+@metrics.instrument(retries=LOCK_RETRIES)
+def import_products(rows):
+    """
+    Додати товари пакетом в одній транзакції.
+    rows — кортежі (назва, категорія, матеріал, колір, ширина, висота,
+    глибина, ціна в гривнях або Money, залишок). Повертає кількість доданих товарів.
+    """
+    rows = [(*row[:7], Money.from_hryvnia(row[7]), row[8]) for row in rows]
+    if not rows:
+        return 0
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.executemany("""
+            INSERT INTO products
+            (name, category, material, color,
+             width, height, depth, base_price, stock_qty)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        add_log("import_products", f"count={len(rows)}",
+                entity_type="product",
+                payload={"count": len(rows),
+                         "stock_qty": sum(row[8] for row in rows)},
+                conn=conn)
+        conn.commit()
+    return len(rows)
 
 
+@metrics.instrument
 def list_low_stock(threshold=5):
     with get_connection() as conn:
         cur = conn.cursor()
@@ -255,12 +1394,191 @@ def list_low_stock(threshold=5):
 
 
 
+_APOSTROPHES = str.maketrans({"’": "'", "ʼ": "'", "‘": "'", "`": "'"})
+_SPACES = re.compile(r"\s+")
+_PHONE_LIKE = re.compile(r"[\d\s()+-]+")
+
+
+def normalize_customer_name(name):
+    """Нормалізоване ім'я покупця: регістр, апострофи, зайві пробіли."""
+    if name is None:
+        return None
+    norm = unicodedata.normalize("NFKC", name).translate(_APOSTROPHES).casefold()
+    norm = _SPACES.sub(" ", norm).strip()
+    return norm or None
+
+
+def normalize_phone(phone):
+    """Телефон лише з цифр: '+38 (067) 123-45-67' -> '380671234567'."""
+    digits = re.sub(r"\D", "", phone or "")
+    return digits or None
+
+
+@metrics.instrument
+def get_or_create_customer(name, phone=None, conn=None):
+    """Повернути id покупця за нормалізованим іменем (створити за потреби)."""
+    norm = normalize_customer_name(name)
+    if norm is None:
+        return None
+    phone = normalize_phone(phone)
+    with _use_connection(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, phone FROM customers WHERE name_norm = ?", (norm,))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute("""
+                INSERT INTO customers (name, name_norm, phone)
+                VALUES (?, ?, ?)
+            """, (_SPACES.sub(" ", name).strip(), norm, phone))
+            return cur.lastrowid
+        customer_id, old_phone = row
+        if phone and phone != old_phone:
+            cur.execute("UPDATE customers SET phone = ? WHERE id = ?",
+                        (phone, customer_id))
+        return customer_id
+
+
+def _has_customer_fts(conn):
+    return _has_table(conn, "customers_fts")
+
+
+# Параметрів в одному списку IN (...): менше за SQLITE_MAX_VARIABLE_NUMBER
+# старих збірок SQLite (999)
+_IDS_PER_QUERY = 500
+
+
+def _customer_match(substr, fts):
+    """Підзапит id покупців, ім'я або телефон яких містить substr."""
+    if _PHONE_LIKE.fullmatch(substr):
+        term = normalize_phone(substr) or ""
+    else:
+        term = normalize_customer_name(substr) or ""
+    # Триграмний індекс працює для фрагментів від 3 символів
+    if fts and len(term) >= 3:
+        phrase = '"' + term.replace('"', '""') + '"'
+        return "SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?", [phrase]
+    return ("SELECT id FROM customers WHERE name_norm LIKE ? OR phone LIKE ?",
+            [f"%{term}%", f"%{term}%"])
+
+
+@metrics.instrument
+def find_customers(substr=None, limit=50, conn=None):
+    """
+    Покупці за частиною імені / телефону разом із сумою покупок (customer_ltv),
+    від найбільшої суми. SQLite не проштовхує підзапит IN у згруповане
+    подання, тож спершу вибираються id збігів, а подання читається за явним
+    списком id (пошук за ключем). Без фільтра агрегуються всі покупці —
+    UI виконує такий запит у фоновому потоці.
+    """
+    sql = """
+        SELECT id, name, phone, purchases, units, lifetime_value,
+               first_purchase, last_purchase
+        FROM customer_ltv
+        {where}
+        ORDER BY lifetime_value DESC
+        LIMIT ?
+    """
+    with _use_connection(conn) as conn:
+        cur = conn.cursor()
+        if not substr:
+            rows = cur.execute(sql.format(where=""), (limit,)).fetchall()
+        else:
+            match_sql, params = _customer_match(substr, _has_customer_fts(conn))
+            ids = [row[0] for row in cur.execute(match_sql, params)]
+            rows = []
+            for i in range(0, len(ids), _IDS_PER_QUERY):
+                chunk = ids[i:i + _IDS_PER_QUERY]
+                where = f"WHERE id IN ({', '.join('?' * len(chunk))})"
+                rows += cur.execute(sql.format(where=where), chunk + [limit]).fetchall()
+            rows = sorted(rows, key=lambda row: row[5], reverse=True)[:limit]
+        return [(*row[:5], Money(row[5]), *row[6:]) for row in rows]
+
+
+@metrics.instrument
+def customer_summary(customer_id, conn=None):
+    """Кількість покупок, одиниць, сума та дати першої / останньої покупки."""
+    with _use_connection(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT id, name, phone, purchases, units, lifetime_value,
+                   first_purchase, last_purchase
+            FROM customer_ltv
+            WHERE id = ?
+        """, (customer_id,))
+        row = cur.fetchone()
+        return row and (*row[:5], Money(row[5]), *row[6:])
+
+
+@metrics.instrument
+def customer_history(customer_id, limit=None, conn=None):
+    """Продажі одного покупця (через індекс idx_sales_customer)."""
+    with _use_connection(conn) as conn:
+        cur = conn.cursor()
+        # Архівні роки — лише ті, що перетинаються з періодом покупок покупця
+        cur.execute("""
+            SELECT first_purchase, last_purchase
+            FROM archived_customer_totals
+            WHERE customer_id = ?
+        """, (customer_id,))
+        archived = cur.fetchone()
+        if archived:
+            source = _sales_source(conn, *archived)
+        else:
+            source = "main.sales"
+        sql = f"""
+        SELECT s.id,
+               s.sale_date,
+               p.name,
+               p.category,
+               s.quantity,
+               s.sale_price,
+               s.discount_percent,
+               (s.quantity * s.sale_price) AS total,
+               s.customer_name
+        FROM {source} s
+        JOIN products p ON p.id = s.product_id
+        WHERE s.customer_id = ?
+        ORDER BY s.sale_date DESC, s.id DESC
+        """
+        params = [customer_id]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        cur.execute(sql, params)
+        return [_sale_row(row) for row in cur.fetchall()]
+
+
+@metrics.instrument(retries=LOCK_RETRIES)
 def add_sale(product_id, quantity, sale_price=None,
-             customer_name=None, discount_percent=0.0):
-    """Зареєструвати продаж із врахуванням знижки."""
-    with get_connection() as conn:
+             customer_name=None, discount_percent=0.0, customer_phone=None,
+             sale_date=None, queue_id=None, conn=None):
+    """
+    Зареєструвати продаж із врахуванням знижки. sale_price — у гривнях
+    або Money (типово — базова ціна товару); ціна зі знижкою округлюється
+    до копійки.
+
+    sale_date (РРРР-ММ-ДД, типово сьогодні) та queue_id передає черга
+    sale_queue.py: продаж із уже записаним queue_id не повторюється —
+    повертається id наявного. З переданим conn нічого не комітиться
+    (продаж стає частиною транзакції викликача).
+    """
+    if sale_date is None:
+        sale_date = datetime.date.today().isoformat()
+    else:
+        try:
+            sale_date = datetime.date.fromisoformat(sale_date).isoformat()
+        except (TypeError, ValueError):
+            raise ValueError(f"Невірна дата продажу: {sale_date!r}") from None
+
+    with _use_connection(conn) as conn:
         cur = conn.cursor()
 
+        if queue_id is not None:
+            cur.execute("SELECT id FROM sales WHERE queue_id = ?", (queue_id,))
+            row = cur.fetchone()
+            if row is not None:
+                return row[0]
+
         # Базова ціна
         if sale_price is None:
             cur.execute("SELECT base_price FROM products WHERE id = ?",
@@ -268,9 +1586,9 @@ def add_sale(product_id, quantity, sale_price=None,
             row = cur.fetchone()
             if row is None:
                 raise ValueError("Товар з таким ID не знайдено.")
-            base_price = row[0]
+            base_price = Money(row[0])
         else:
-            base_price = sale_price
+            base_price = Money.from_hryvnia(sale_price)
 
         # Перевірка залишку
         cur.execute("SELECT stock_qty, name FROM products WHERE id = ?",
@@ -286,33 +1604,82 @@ def add_sale(product_id, quantity, sale_price=None,
 
         # Розрахунок кінцевої ціни зі знижкою
         disc = float(discount_percent or 0)
-        final_price = base_price * (1 - disc / 100)
+        final_price = Money(
+            (base_price * (100 - Decimal(str(disc))) / 100).to_integral_value(ROUND_HALF_UP)
+        )
 
         new_qty = stock_qty - quantity
         cur.execute("UPDATE products SET stock_qty = ? WHERE id = ?",
                     (new_qty, product_id))
 
-        sale_date = datetime.date.today().isoformat()
+        customer_id = get_or_create_customer(customer_name, customer_phone, conn=conn)
+
         cur.execute("""
             INSERT INTO sales (product_id, quantity, sale_price,
-                               discount_percent, sale_date, customer_name)
-            VALUES (?, ?, ?, ?, ?, ?)
+                               discount_percent, sale_date, customer_name,
+                               customer_id, queue_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (product_id, quantity, final_price,
-              disc, sale_date, customer_name))
+              disc, sale_date, customer_name, customer_id, queue_id))
+        sale_id = cur.lastrowid
 
-        conn.commit()
+        add_log(
+            "add_sale",
+            f"product_id={product_id}, name={prod_name}, qty={quantity}, "
+            f"price={final_price}, discount={disc:.1f}%, customer={customer_name}",
+            entity_type="product", entity_id=product_id,
+            payload={"sale_id": sale_id, "qty": quantity, "price": str(final_price),
+                     "discount": disc, "customer_id": customer_id,
+                     "customer": customer_name, "queue_id": queue_id},
+            conn=conn,
+        )
 
-    add_log(
-        "add_sale",
-        f"product_id={product_id}, name={prod_name}, qty={quantity}, "
-        f"price={final_price:.2f}, discount={disc:.1f}%, customer={customer_name}"
-    )
+    metrics.SALES.inc()
+    metrics.SOLD_UNITS.inc(quantity)
+    return sale_id
+
+
+def iter_sales(limit=None, conn=None):
+    """Останні продажі (SaleRow), від новіших до старіших."""
+    yield from iter_sales_filtered(limit=limit, conn=conn)
 
 
 def list_sales(limit=None):
-    with get_connection() as conn:
+    return list(iter_sales(limit))
+
+
+def _sales_filter(name_substr=None, date_from=None,
+                  date_to=None, customer_substr=None, fts=False):
+    """Умова WHERE та параметри для фільтра продажів (s = sales, p = products)."""
+    sql = "1=1"
+    params = []
+    if name_substr:
+        sql += " AND p.name LIKE ?"
+        params.append(f"%{name_substr}%")
+    if customer_substr:
+        match_sql, match_params = _customer_match(customer_substr, fts)
+        sql += f" AND s.customer_id IN ({match_sql})"
+        params.extend(match_params)
+    if date_from:
+        sql += " AND s.sale_date >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND s.sale_date <= ?"
+        params.append(date_to)
+    return sql, params
+
+
+@metrics.instrument
+def iter_sales_filtered(name_substr=None, date_from=None,
+                        date_to=None, customer_substr=None, limit=None,
+                        conn=None):
+    """Продажі (SaleRow) з фільтрами: назва товару, діапазон дат, покупець."""
+    with _use_connection(conn) as conn:
+        where, params = _sales_filter(name_substr, date_from, date_to,
+                                      customer_substr, _has_customer_fts(conn))
+        source = _sales_source(conn, date_from, date_to)
         cur = conn.cursor()
-        sql = """
+        sql = f"""
         SELECT s.id,
                s.sale_date,
                p.name,
@@ -322,69 +1689,271 @@ def list_sales(limit=None):
                s.discount_percent,
                (s.quantity * s.sale_price) AS total,
                s.customer_name
-        FROM sales s
+        FROM {source} s
         JOIN products p ON p.id = s.product_id
+        WHERE {where}
         ORDER BY s.sale_date DESC, s.id DESC
         """
         if limit:
             sql += " LIMIT ?"
-            cur.execute(sql, (limit,))
-        else:
-            cur.execute(sql)
-        return cur.fetchall()
+            params.append(limit)
+
+        cur.execute(sql, params)
+        yield from _iter_rows(cur, _sale_row)
 
 
 def list_sales_filtered(name_substr=None, date_from=None,
-                        date_to=None, customer_substr=None, limit=None):
-    """Продажі з фільтрами: назва товару, діапазон дат, покупець."""
-    with get_connection() as conn:
+                        date_to=None, customer_substr=None, limit=None,
+                        conn=None):
+    return list(iter_sales_filtered(name_substr, date_from, date_to,
+                                    customer_substr, limit, conn=conn))
+
+
+@metrics.instrument
+def sales_summary(name_substr=None, date_from=None, date_to=None,
+                  customer_substr=None, conn=None):
+    """
+    Підсумки всіх продажів за фільтром list_sales_filtered (без LIMIT):
+    (чеків, одиниць, виручка Money, середня знижка %). Один прохід агрегації;
+    без фільтра за назвою товару читаються лише покриваючі індекси sales.
+    """
+    with _use_connection(conn) as conn:
+        where, params = _sales_filter(name_substr, date_from, date_to,
+                                      customer_substr, _has_customer_fts(conn))
+        source = _sales_source(conn, date_from, date_to)
+        join = "JOIN products p ON p.id = s.product_id" if name_substr else ""
         cur = conn.cursor()
-        sql = """
-        SELECT s.id,
-               s.sale_date,
-               p.name,
-               p.category,
-               s.quantity,
-               s.sale_price,
-               s.discount_percent,
-               (s.quantity * s.sale_price) AS total,
-               s.customer_name
-        FROM sales s
+        cur.execute(f"""
+            SELECT COUNT(*),
+                   COALESCE(SUM(s.quantity), 0),
+                   COALESCE(SUM(s.quantity * s.sale_price), 0),
+                   COALESCE(AVG(s.discount_percent), 0)
+            FROM {source} s
+            {join}
+            WHERE {where}
+        """, params)
+        count, units, revenue, discount = cur.fetchone()
+        return count, units, Money(revenue), discount
+
+
+def _keyed_total(row):
+    """(дата / категорія, сума в копійках) -> (..., Money)."""
+    return row[0], Money(row[1])
+
+
+@metrics.instrument
+def iter_total_by_day(date_from=None, date_to=None, conn=None):
+    """Виручка за днями (дата, сума Money), від новіших днів до старіших."""
+    sql = """
+        SELECT sale_date,
+               SUM(quantity * sale_price) AS total
+        FROM {source}
+        WHERE 1=1
+    """
+    params = []
+    if date_from:
+        sql += " AND sale_date >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND sale_date <= ?"
+        params.append(date_to)
+    sql += " GROUP BY sale_date ORDER BY sale_date DESC"
+    with _use_connection(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(sql.format(source=_sales_source(conn, date_from, date_to)), params)
+        yield from _iter_rows(cur, _keyed_total)
+
+
+def report_total_by_day(date_from=None, date_to=None, conn=None):
+    return list(iter_total_by_day(date_from, date_to, conn=conn))
+
+
+@metrics.instrument
+def report_sales_date_range(conn=None):
+    """Дата першого та останнього продажу (None, None — якщо продажів немає)."""
+    with _use_connection(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT MIN(sale_date), MAX(sale_date) FROM sales")
+        lo, hi = cur.fetchone()
+        if _has_table(conn, "archive_partitions"):
+            cur.execute("SELECT MIN(date_from), MAX(date_to) FROM archive_partitions")
+            arch_lo, arch_hi = cur.fetchone()
+            lo = min(d for d in (lo, arch_lo) if d) if (lo or arch_lo) else None
+            hi = max(d for d in (hi, arch_hi) if d) if (hi or arch_hi) else None
+        return lo, hi
+
+
+@metrics.instrument
+def report_revenue_series(date_from, date_to, buckets=300, conn=None):
+    """
+    Виручка за період, стиснута до не більше ніж buckets точок.
+
+    Денні суми рахуються в SQL і групуються у рівні інтервали дат
+    (min/max-бакетування), тож для графіка ширини W достатньо ~W/2 точок
+    незалежно від кількості днів. Повертає рядки
+    (перша дата, остання дата, мін. за день, макс. за день, сума, днів з продажами);
+    суми — Money.
+    Якщо в періоді не більше buckets днів — кожен рядок відповідає одному дню.
+    """
+    span = (datetime.date.fromisoformat(date_to)
+            - datetime.date.fromisoformat(date_from)).days + 1
+    buckets = max(1, min(buckets, span))
+    with _use_connection(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+        WITH daily AS (
+            SELECT sale_date,
+                   SUM(quantity * sale_price) AS total
+            FROM {_sales_source(conn, date_from, date_to)}
+            WHERE sale_date BETWEEN ? AND ?
+            GROUP BY sale_date
+        )
+        SELECT MIN(sale_date),
+               MAX(sale_date),
+               MIN(total),
+               MAX(total),
+               SUM(total),
+               COUNT(*)
+        FROM daily
+        GROUP BY CAST((julianday(sale_date) - julianday(?)) * ? / ? AS INTEGER)
+        ORDER BY 1
+        """, (date_from, date_to, date_from, buckets, span))
+        return [(first, last, Money(low), Money(high), Money(total), days)
+                for first, last, low, high, total, days in cur.fetchall()]
+
+
+@metrics.instrument
+def report_revenue_by_category(date_from=None, date_to=None, conn=None):
+    """Виручка за категоріями товарів за період: (категорія, сума Money)."""
+    sql = """
+        SELECT p.category,
+               SUM(s.quantity * s.sale_price) AS total
+        FROM {source} s
         JOIN products p ON p.id = s.product_id
         WHERE 1=1
-        """
-        params = []
-
-        if name_substr:
-            sql += " AND p.name LIKE ?"
-            params.append(f"%{name_substr}%")
-        if customer_substr:
-            sql += " AND s.customer_name LIKE ?"
-            params.append(f"%{customer_substr}%")
-        if date_from:
-            sql += " AND s.sale_date >= ?"
-            params.append(date_from)
-        if date_to:
-            sql += " AND s.sale_date <= ?"
-            params.append(date_to)
-
-        sql += " ORDER BY s.sale_date DESC, s.id DESC"
-        if limit:
-            sql += " LIMIT ?"
-            params.append(limit)
+    """
+    params = []
+    if date_from:
+        sql += " AND s.sale_date >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND s.sale_date <= ?"
+        params.append(date_to)
+    sql += " GROUP BY p.category ORDER BY total DESC"
+    with _use_connection(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(sql.format(source=_sales_source(conn, date_from, date_to)), params)
+        return [_keyed_total(row) for row in cur.fetchall()]
 
-        cur.execute(sql, params)
-        return cur.fetchall()
+
+@metrics.instrument
+def report_product_totals(date_from=None, date_to=None, conn=None):
+    """Продані одиниці та виручка за товарами: (id, назва, категорія, к-сть, сума Money)."""
+    sql = """
+        SELECT p.id,
+               p.name,
+               p.category,
+               t.units,
+               t.total
+        FROM (
+            SELECT product_id,
+                   SUM(quantity) AS units,
+                   SUM(quantity * sale_price) AS total
+            FROM {source}
+            WHERE 1=1
+    """
+    params = []
+    if date_from:
+        sql += " AND sale_date >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND sale_date <= ?"
+        params.append(date_to)
+    sql += """
+            GROUP BY product_id
+        ) t
+        JOIN products p ON p.id = t.product_id
+        ORDER BY t.total DESC
+    """
+    with _use_connection(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(sql.format(source=_sales_source(conn, date_from, date_to)), params)
+        return [(*row[:4], Money(row[4])) for row in cur.fetchall()]
 
 
-def report_total_by_day():
+# --- Обслуговування ------------------------------------------------------------
+
+@metrics.instrument
+def backup_database(dest, pages=1024, progress=None):
+    """
+    Резервна копія БД через SQLite backup API (працює, поки інші процеси
+    пишуть у БД). Архівні файли років копіюються поруч із dest під тими ж
+    іменами, бо archive_partitions посилається на них відносно основної БД.
+    progress(status, remaining, total) — як у sqlite3.Connection.backup.
+    Повертає список створених файлів.
+    """
+    dest = Path(dest)
+    if not config.is_memory() and dest.exists() and dest.samefile(config.db_path()):
+        raise ValueError("Файл резервної копії збігається з робочою БД.")
+    written = []
     with get_connection() as conn:
+        target = sqlite3.connect(dest)
+        try:
+            conn.backup(target, pages=pages, progress=progress)
+        finally:
+            target.close()
+        written.append(dest)
+
+        partitions = []
+        if _has_table(conn, "archive_partitions"):
+            partitions = conn.execute(
+                "SELECT year, path FROM archive_partitions ORDER BY year"
+            ).fetchall()
+        main_path = _main_db_path(conn)
+        for _year, file_name in partitions:
+            source = sqlite3.connect(
+                main_path.with_name(file_name).resolve().as_uri() + "?mode=ro", uri=True
+            )
+            target = sqlite3.connect(dest.with_name(file_name))
+            try:
+                source.backup(target, pages=pages)
+            finally:
+                target.close()
+                source.close()
+            written.append(dest.with_name(file_name))
+    return written
+
+
+@metrics.instrument
+def database_stats(conn=None):
+    """Коротка статистика БД: розміри, кількість рядків, період і сума продажів."""
+    with _use_connection(conn) as conn:
         cur = conn.cursor()
-        cur.execute("""
-        SELECT sale_date,
-               SUM(quantity * sale_price) AS total
-        FROM sales
-        GROUP BY sale_date
-        ORDER BY sale_date DESC
+        stats = {
+            "schema_version": cur.execute("PRAGMA user_version").fetchone()[0],
+        }
+        page_size = cur.execute("PRAGMA page_size").fetchone()[0]
+        stats["db_bytes"] = cur.execute("PRAGMA page_count").fetchone()[0] * page_size
+        stats["free_bytes"] = cur.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+        for table in _METRIC_TABLES:
+            if _has_table(conn, table):
+                stats[f"{table}_rows"] = cur.execute(
+                    f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        cur.execute("SELECT COALESCE(SUM(stock_qty), 0) FROM products")
+        stats["stock_units"] = cur.fetchone()[0]
+
+        stats["sales_from"], stats["sales_to"] = report_sales_date_range(conn=conn)
+        source = _sales_source(conn)
+        cur.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(quantity), 0),
+                   COALESCE(SUM(quantity * sale_price), 0)
+            FROM {source}
         """)
-        return cur.fetchall()
+        stats["sales_total_rows"], stats["sold_units"], revenue = cur.fetchone()
+        stats["revenue"] = Money(revenue)
+        if _has_table(conn, "archive_partitions"):
+            stats["archived_years"] = ",".join(
+                str(row[0]) for row in
+                cur.execute("SELECT year FROM archive_partitions ORDER BY year")
+            )
+        return stats
@@ -0,0 +1,116 @@
+# federation.py
+"""
+Зведені звіти по кількох магазинах (окремий файл БД на кожен салон).
+
+Кожна БД обробляється в окремому процесі (ProcessPoolExecutor) і
+повертає лише агрегати: виручку за днями, залишки та продажі за
+товарами. Сирі рядки продажів між процесами не передаються.
+Товари різних магазинів зіставляються за парою (назва, категорія),
+оскільки їхні id у кожній БД свої.
+"""
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from db import Money, iter_products, iter_total_by_day, report_product_totals
+
+
+# З цієї версії схеми ціни зберігаються в копійках (міграція v8 у db.py)
+MONEY_SCHEMA_VERSION = 8
+
+
+def open_readonly(path):
+    """З'єднання лише для читання (файл магазину не змінюється і не створюється)."""
+    uri = Path(path).resolve().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True)
+
+
+def store_aggregates(path, date_from=None, date_to=None):
+    """Агрегати одного магазину. Виконується в дочірньому процесі."""
+    conn = open_readonly(path)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < MONEY_SCHEMA_VERSION:
+            raise ValueError(
+                f"{Path(path).name}: стара схема БД (версія {version}, ціни не в копійках). "
+                f"Відкрийте цю БД програмою один раз, щоб оновити її."
+            )
+        revenue_by_day = dict(iter_total_by_day(date_from, date_to, conn=conn))
+
+        stock = {}
+        for p in iter_products(conn=conn):
+            key = (p.name, p.category)
+            stock[key] = stock.get(key, 0) + p.stock_qty
+
+        products = {}
+        for _pid, name, category, units, total in report_product_totals(
+                date_from, date_to, conn=conn):
+            old_units, old_total = products.get((name, category), (0, 0))
+            products[(name, category)] = (old_units + units, old_total + total)
+    finally:
+        conn.close()
+
+    return {
+        "store": Path(path).stem,
+        "revenue_by_day": revenue_by_day,
+        "stock": stock,
+        "products": products,
+    }
+
+
+def merge_aggregates(parts, top=20):
+    """Об'єднати агрегати магазинів у зведений звіт."""
+    revenue_by_day = {}
+    stock = {}
+    products = {}
+    stores = []
+
+    for part in parts:
+        for day, total in part["revenue_by_day"].items():
+            revenue_by_day[day] = revenue_by_day.get(day, 0) + total
+        for key, qty in part["stock"].items():
+            stock[key] = stock.get(key, 0) + qty
+        for key, (units, total) in part["products"].items():
+            old_units, old_total = products.get(key, (0, 0))
+            products[key] = (old_units + units, old_total + total)
+
+        stores.append((
+            part["store"],
+            sum(units for units, _total in part["products"].values()),
+            sum(part["revenue_by_day"].values()),
+            sum(part["stock"].values()),
+        ))
+
+    bestsellers = sorted(
+        ((name, category, units, total)
+         for (name, category), (units, total) in products.items()),
+        key=lambda row: row[3], reverse=True,
+    )[:top]
+
+    # Суми Money при додаванні стають int — повертаємо тип для форматування
+    return {
+        # (магазин, продано одиниць, виручка, залишок одиниць)
+        "stores": sorted(((store, units, Money(revenue), qty)
+                          for store, units, revenue, qty in stores),
+                         key=lambda row: row[2], reverse=True),
+        "revenue_by_day": sorted(((day, Money(total)) for day, total in revenue_by_day.items()),
+                                 reverse=True),
+        "stock": sorted((name, category, qty) for (name, category), qty in stock.items()),
+        "bestsellers": [(name, category, units, Money(total))
+                        for name, category, units, total in bestsellers],
+    }
+
+
+def consolidate(paths, date_from=None, date_to=None, top=20, max_workers=None):
+    """Порахувати агрегати всіх магазинів паралельно та об'єднати їх."""
+    paths = [os.fspath(p) for p in paths]
+    if not paths:
+        return merge_aggregates([], top)
+    max_workers = max_workers or min(len(paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        parts = list(pool.map(
+            store_aggregates, paths,
+            [date_from] * len(paths), [date_to] * len(paths),
+        ))
+    return merge_aggregates(parts, top)
@@ -0,0 +1,193 @@
+# live_filter.py
+"""
+Фільтрація «на льоту» для таблиць Tkinter.
+
+- запит запускається з затримкою після останнього натискання клавіші;
+- запит виконується у фоновому потоці з власним з'єднанням, а застарілий
+  запит скасовується через Connection.interrupt();
+- якщо новий фільтр лише уточнює попередній, а попередній результат
+  був повним (не обрізаний LIMIT), рядки звужуються без звернення до БД.
+"""
+import queue
+import sqlite3
+import threading
+
+from db import get_connection
+
+
+_ASCII_LOWER = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"
+)
+
+
+def like_fold(text):
+    """Нормалізація рядка так само, як порівнює LIKE у SQLite (лише ASCII)."""
+    return (text or "").translate(_ASCII_LOWER)
+
+
+def like_contains(value, substr):
+    """Аналог `value LIKE '%substr%'` у Python."""
+    if not substr:
+        return True
+    if value is None:
+        return False
+    return like_fold(substr) in like_fold(value)
+
+
+def substr_refines(new, old):
+    """Чи є підрядок new уточненням old (кожен збіг new — також збіг old)."""
+    if not old:
+        return True
+    if not new or "%" in new or "_" in new:
+        return False
+    return like_fold(old) in like_fold(new)
+
+
+def range_refines(new_min, new_max, old_min, old_max):
+    """Чи вкладений діапазон [new_min, new_max] у [old_min, old_max]."""
+    if old_min is not None and (new_min is None or new_min < old_min):
+        return False
+    if old_max is not None and (new_max is None or new_max > old_max):
+        return False
+    return True
+
+
+class LiveFilter:
+    """
+    Керує відкладеним виконанням запиту фільтра для одного віджета.
+
+    query(params, conn) -> rows     виконується у фоновому потоці;
+    on_result(rows)                 викликається в потоці Tk;
+    refines(new, old) -> bool       чи звужує новий фільтр попередній;
+    match(row, params) -> bool      перевірка рядка для локального звуження;
+    on_error(exc)                   помилка запиту (БД заблокована, немає
+                                    архівного файлу тощо), у потоці Tk.
+    """
+
+    POLL_MS = 20
+
+    def __init__(self, widget, query, on_result, refines=None, match=None,
+                 delay_ms=300, limit=None, on_error=None):
+        self.widget = widget
+        self.query = query
+        self.on_result = on_result
+        self.on_error = on_error
+        self.refines = refines
+        self.match = match
+        self.delay_ms = delay_ms
+        self.limit = limit
+
+        self._after_id = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._results = queue.Queue()
+        self._pending = None
+        self._polling = False
+
+        # Останній показаний результат: (params, rows, complete)
+        self._cache = None
+
+    def schedule(self, params):
+        """Запустити фільтр після паузи у введенні (debounce)."""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        if self._pending is None and self._cache is not None and self._cache[0] == params:
+            return  # фільтр не змінився (стрілки, Tab тощо)
+        self._after_id = self.widget.after(self.delay_ms, self._run, params, True)
+
+    def run_now(self, params):
+        """Негайно виконати запит до БД (кнопка, оновлення після змін даних)."""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+        self._run(params, False)
+
+    def cancel(self):
+        """
+        Скасувати відкладений і поточний запит та забути показаний результат —
+        таблицю заповнено в обхід фільтра (наприклад, пошуком за розміром).
+        """
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self._pending = None
+        self._cancel_inflight()
+        self._cache = None
+
+    def _run(self, params, allow_narrowing):
+        self._after_id = None
+        self._generation += 1
+
+        if allow_narrowing and self._can_narrow(params):
+            _old_params, rows, _complete = self._cache
+            rows = [row for row in rows if self.match(row, params)]
+            self._pending = None
+            self._cancel_inflight()
+            self._cache = (params, rows, True)
+            self.on_result(rows)
+            return
+
+        self._pending = self._generation
+        self._cancel_inflight()
+        worker = threading.Thread(
+            target=self._work, args=(self._generation, params), daemon=True
+        )
+        worker.start()
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.POLL_MS, self._poll)
+
+    def _can_narrow(self, params):
+        if self._cache is None or self.refines is None or self.match is None:
+            return False
+        old_params, _rows, complete = self._cache
+        return complete and self.refines(params, old_params)
+
+    def _cancel_inflight(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def _work(self, generation, params):
+        conn = get_connection()
+        with self._lock:
+            self._conn = conn
+        try:
+            rows = self.query(params, conn)
+        except (sqlite3.Error, ValueError) as e:
+            # Якщо запит перервано через interrupt(), результат відкидає _poll
+            # (він належить застарілому поколінню)
+            self._results.put((generation, params, e))
+            return
+        finally:
+            with self._lock:
+                if self._conn is conn:
+                    self._conn = None
+            conn.close()
+        self._results.put((generation, params, rows))
+
+    def _poll(self):
+        while self._pending is not None:
+            try:
+                generation, params, rows = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._pending:
+                continue
+            self._pending = None
+            self._polling = False
+            if isinstance(rows, Exception):
+                # Попередній результат лишається на екрані та в кеші
+                if self.on_error is not None:
+                    self.on_error(rows)
+                return
+            complete = self.limit is None or len(rows) < self.limit
+            self._cache = (params, rows, complete)
+            self.on_result(rows)
+            return
+
+        if self._pending is None:
+            self._polling = False
+            return
+        self.widget.after(self.POLL_MS, self._poll)
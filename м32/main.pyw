@@ -1,10 +1,12 @@
 from db import init_db, seed_test_data
 from ui import FurnitureApp
+import metrics
 
 
 if __name__ == "__main__":
     init_db()
     seed_test_data()
+    metrics.start_from_env()
 
     app = FurnitureApp()
     app.mainloop()
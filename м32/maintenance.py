@@ -0,0 +1,247 @@
+# maintenance.py
+"""
+Обслуговування БД: PRAGMA optimize, ANALYZE, контрольна точка WAL, vacuum.
+
+Запускається у простої (у вікні давно не було подій, а файли БД / WAL
+давно не змінювались), при закритті вікна або з cli.py. Кожен крок
+обмежений у часі через progress handler: якщо крок не вклався, SQLite
+перериває його без змін у БД. Що зроблено і скільки тривало —
+записується в журнал (дія "maintenance").
+"""
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import config
+from db import add_log, get_connection, search_logs
+
+
+STEPS = ("optimize", "analyze", "checkpoint", "vacuum")
+SHUTDOWN_STEPS = ("optimize", "checkpoint")
+
+STEP_TIMEOUT = 5.0          # с, на кожен крок
+ANALYSIS_LIMIT = 1000       # рядків індексу, які ANALYZE переглядає (наближена статистика)
+INCREMENTAL_PAGES = 2000    # сторінок за один incremental_vacuum
+FREE_RATIO = 0.25           # частка вільних сторінок, з якої робиться повний VACUUM
+PROGRESS_OPS = 10_000       # як часто (в інструкціях VDBE) перевіряти час
+SHUTDOWN_BUSY_MS = 500      # скільки чекати на блокування БД при закритті вікна
+
+log = logging.getLogger(__name__)
+
+
+class _Deadline:
+    """Progress handler: перервати крок після дедлайну або за cancel()."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.deadline = None
+        self.cancelled = False
+        conn.set_progress_handler(self._check, PROGRESS_OPS)
+
+    def start(self, seconds):
+        self.deadline = time.monotonic() + seconds
+
+    def _check(self):
+        return self.cancelled or time.monotonic() > self.deadline
+
+    def cancel(self):
+        self.cancelled = True
+        self.conn.interrupt()
+
+
+def _optimize(conn):
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("PRAGMA optimize").fetchall()
+    return {}
+
+
+def _analyze(conn):
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+    return {"analysis_limit": ANALYSIS_LIMIT}
+
+
+def _checkpoint(conn):
+    if config.is_memory():
+        return {"status": "skipped"}
+    busy, wal_pages, done = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    if wal_pages < 0:
+        return {"status": "skipped", "reason": "not wal"}
+    return {"busy": bool(busy), "wal_pages": wal_pages, "checkpointed": done}
+
+
+def _vacuum(conn, full=False):
+    if config.is_memory():
+        return {"status": "skipped"}
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if auto_vacuum == 2 and not full:
+        conn.execute(f"PRAGMA incremental_vacuum({INCREMENTAL_PAGES})").fetchall()
+        left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return {"mode": "incremental", "freed_pages": free - left}
+    if full or (pages and free / pages >= FREE_RATIO):
+        # Після повного VACUUM надалі достатньо incremental_vacuum
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        after = conn.execute("PRAGMA page_count").fetchone()[0]
+        return {"mode": "full", "freed_pages": pages - after}
+    return {"status": "skipped", "free_pages": free}
+
+
+def run_maintenance(steps=STEPS, step_timeout=STEP_TIMEOUT, full_vacuum=False,
+                    on_start=None, busy_timeout=None):
+    """
+    Виконати кроки обслуговування й записати результат у журнал.
+    on_start(cancel) отримує функцію, якою можна перервати поточний крок
+    (наприклад, коли користувач повернувся до роботи).
+    busy_timeout (мс) замінює PRAGMA busy_timeout з config: progress handler
+    не перериває очікування блокування іншим процесом.
+    Повертає список словників {step, status, seconds, ...}.
+    """
+    unknown = set(steps) - set(STEPS)
+    if unknown:
+        raise ValueError(f"Невідомі кроки обслуговування: {', '.join(sorted(unknown))}")
+
+    conn = get_connection()
+    conn.isolation_level = None  # VACUUM не можна виконувати в транзакції
+    if busy_timeout is not None:
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+    deadline = _Deadline(conn)
+    if on_start is not None:
+        on_start(deadline.cancel)
+    results = []
+    try:
+        for step in STEPS:
+            if step not in steps:
+                continue
+            if deadline.cancelled:
+                results.append({"step": step, "status": "cancelled", "seconds": 0.0})
+                continue
+            deadline.start(step_timeout)
+            start = time.perf_counter()
+            try:
+                if step == "optimize":
+                    info = _optimize(conn)
+                elif step == "analyze":
+                    info = _analyze(conn)
+                elif step == "checkpoint":
+                    info = _checkpoint(conn)
+                else:
+                    info = _vacuum(conn, full_vacuum)
+                info.setdefault("status", "ok")
+            except Exception as e:
+                if "interrupt" in str(e).lower():
+                    info = {"status": "cancelled" if deadline.cancelled else "timeout"}
+                else:
+                    info = {"status": "error", "error": str(e)}
+            results.append({"step": step, **info,
+                            "seconds": round(time.perf_counter() - start, 3)})
+
+        # Через те саме з'єднання — з тим самим busy_timeout
+        conn.set_progress_handler(None, 0)
+        add_log("maintenance",
+                "; ".join(f"{r['step']} {r['status']} {r['seconds']:.2f}s" for r in results),
+                user="system", payload={"steps": results}, conn=conn)
+    finally:
+        conn.set_progress_handler(None, 0)
+        conn.close()
+    return results
+
+
+def last_run_age():
+    """Скільки секунд минуло з останнього обслуговування (None — не було)."""
+    rows = search_logs(action="maintenance", limit=1)
+    if not rows:
+        return None
+    last = datetime.datetime.fromisoformat(rows[0][1])
+    return (datetime.datetime.now() - last).total_seconds()
+
+
+def last_write_age():
+    """Секунд від останньої зміни файлу БД або WAL (None для БД у пам'яті)."""
+    if config.is_memory():
+        return None
+    path = os.fspath(config.db_path())
+    mtimes = [os.path.getmtime(p) for p in (path, path + "-wal") if os.path.exists(p)]
+    if not mtimes:
+        return None
+    return time.time() - max(mtimes)
+
+
+class MaintenanceScheduler:
+    """
+    Запускає run_maintenance() у фоновому потоці, коли вікно widget
+    простоює idle_seconds, у БД не було записів quiet_seconds, а з
+    попереднього обслуговування минуло min_interval секунд.
+    Будь-яка подія клавіатури / миші перериває поточний крок.
+    """
+
+    CHECK_MS = 30_000
+
+    def __init__(self, widget, idle_seconds=300, quiet_seconds=120, min_interval=6 * 3600):
+        self.widget = widget
+        self.idle_seconds = idle_seconds
+        self.quiet_seconds = quiet_seconds
+        self.min_interval = min_interval
+
+        self._last_activity = time.monotonic()
+        self._cancel = None
+        self._thread = None
+        for sequence in ("<Any-KeyPress>", "<Any-ButtonPress>", "<MouseWheel>"):
+            widget.bind_all(sequence, self._on_activity, add="+")
+        widget.after(self.CHECK_MS, self._check)
+
+    def _on_activity(self, event=None):
+        self._last_activity = time.monotonic()
+        if self._cancel is not None:
+            self._cancel()
+
+    def _is_due(self):
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        if time.monotonic() - self._last_activity < self.idle_seconds:
+            return False
+        write_age = last_write_age()
+        if write_age is not None and write_age < self.quiet_seconds:
+            return False
+        run_age = last_run_age()
+        return run_age is None or run_age >= self.min_interval
+
+    def _check(self):
+        try:
+            if self._is_due():
+                self._thread = threading.Thread(
+                    target=self._run, name="db-maintenance", daemon=True
+                )
+                self._thread.start()
+        finally:
+            self.widget.after(self.CHECK_MS, self._check)
+
+    def _run(self):
+        try:
+            run_maintenance(on_start=self._set_cancel)
+        finally:
+            self._cancel = None
+
+    def _set_cancel(self, cancel):
+        self._cancel = cancel
+
+    def shutdown(self, step_timeout=2.0):
+        """
+        Перервати фонове обслуговування та виконати короткі кроки перед виходом.
+        Якщо БД зайнята іншим процесом, кроки пропускаються — закриття вікна
+        не чекає й не падає.
+        """
+        if self._cancel is not None:
+            self._cancel()
+        if self._thread is not None:
+            self._thread.join(timeout=step_timeout)
+        try:
+            run_maintenance(SHUTDOWN_STEPS, step_timeout=step_timeout,
+                            busy_timeout=SHUTDOWN_BUSY_MS)
+        except sqlite3.Error as e:
+            log.warning("Обслуговування при закритті пропущено: %s", e)
@@ -0,0 +1,331 @@
+# metrics.py
+"""
+Операційні метрики у форматі Prometheus (text exposition format).
+
+Лічильники та гістограми оновлюються з db.py та ui.py; показники, які
+дешевше зібрати в момент запиту (розмір файлів БД, кількість рядків),
+додаються функціями-колекторами. Метрики можна періодично записувати
+у файл для textfile collector node_exporter-а або віддавати по HTTP
+на localhost.
+"""
+import functools
+import inspect
+import os
+import sqlite3
+import threading
+import time
+
+
+# Межі гістограм тривалості, секунди
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_metrics = {}      # name -> Counter / Gauge / Histogram
+_collectors = []   # функції, що повертають [(name, type, help, labels, value), ...]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + inner + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def render(self):
+        lines = self.header()
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = key + (("le", _format_value(float(bound))),)
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {cumulative}")
+            labels = key + (("le", "+Inf"),)
+            lines.append(f"{self.name}_bucket{_format_labels(labels)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+def _register(metric):
+    with _lock:
+        return _metrics.setdefault(metric.name, metric)
+
+
+def counter(name, help_text):
+    return _register(Counter(name, help_text))
+
+
+def gauge(name, help_text):
+    return _register(Gauge(name, help_text))
+
+
+def histogram(name, help_text, buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help_text, buckets))
+
+
+def register_collector(func):
+    """Додати функцію, що повертає [(name, type, help, {labels}, value), ...] при кожному зборі."""
+    with _lock:
+        _collectors.append(func)
+    return func
+
+
+# --- стандартні метрики застосунку ------------------------------------------
+
+DB_OPERATIONS = counter(
+    "furniture_db_operations_total", "Кількість викликів операцій db.py за результатом.")
+DB_OPERATION_SECONDS = histogram(
+    "furniture_db_operation_seconds", "Тривалість операцій db.py, секунди.")
+DB_LOCK_ERRORS = counter(
+    "furniture_db_lock_errors_total", "OperationalError через блокування БД (database is locked/busy).")
+DB_RETRIES = counter(
+    "furniture_db_retries_total", "Повторні спроби операцій після блокування БД.")
+SALES = counter(
+    "furniture_sales_total", "Кількість зареєстрованих продажів.")
+SOLD_UNITS = counter(
+    "furniture_sold_units_total", "Кількість проданих одиниць товару.")
+UI_REFRESH_SECONDS = histogram(
+    "furniture_ui_refresh_seconds", "Тривалість оновлення вкладок FurnitureApp, секунди.")
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def instrument(func=None, *, retries=0, backoff=0.1):
+    """
+    Декоратор для функцій db.py: лічильник викликів, гістограма тривалості,
+    облік блокувань. retries > 0 — повторити операцію після
+    «database is locked» (лише для операцій, що самі відкривають транзакцію):
+    якщо передано conn, транзакцією володіє викликач, і повторів немає —
+    інакше повтор виконав би зміни вдруге в його відкритій транзакції.
+    Для генераторів (iter_*) вимірюється весь прохід до вичерпання або
+    закриття; повторів немає, бо частину рядків уже віддано. Обгортки
+    list_* над iter_* не декоруються, щоб виклик не рахувався двічі.
+    """
+    if func is None:
+        return functools.partial(instrument, retries=retries, backoff=backoff)
+
+    op = func.__name__
+    params = inspect.signature(func).parameters
+    conn_index = list(params).index("conn") if "conn" in params else None
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def gen_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = "error"
+            try:
+                yield from func(*args, **kwargs)
+                status = "ok"
+            except GeneratorExit:
+                status = "ok"  # споживач зупинився раніше — це не помилка
+                raise
+            except sqlite3.OperationalError as e:
+                if is_lock_error(e):
+                    DB_LOCK_ERRORS.inc(op=op)
+                raise
+            finally:
+                DB_OPERATION_SECONDS.observe(time.perf_counter() - start, op=op)
+                DB_OPERATIONS.inc(op=op, status=status)
+
+        return gen_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempt = 0
+        max_retries = retries
+        if conn_index is not None:
+            conn = kwargs.get("conn", args[conn_index] if len(args) > conn_index else None)
+            if conn is not None:
+                max_retries = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                DB_OPERATION_SECONDS.observe(time.perf_counter() - start, op=op)
+                if is_lock_error(e):
+                    DB_LOCK_ERRORS.inc(op=op)
+                    if attempt < max_retries:
+                        attempt += 1
+                        DB_RETRIES.inc(op=op)
+                        time.sleep(backoff * (3 ** (attempt - 1)))
+                        continue
+                DB_OPERATIONS.inc(op=op, status="error")
+                raise
+            except Exception:
+                DB_OPERATION_SECONDS.observe(time.perf_counter() - start, op=op)
+                DB_OPERATIONS.inc(op=op, status="error")
+                raise
+            DB_OPERATION_SECONDS.observe(time.perf_counter() - start, op=op)
+            DB_OPERATIONS.inc(op=op, status="ok")
+            return result
+
+    return wrapper
+
+
+# --- експорт -----------------------------------------------------------------
+
+def render():
+    """Усі метрики в текстовому форматі Prometheus."""
+    with _lock:
+        metrics = list(_metrics.values())
+        collectors = list(_collectors)
+
+    lines = []
+    for metric in metrics:
+        with _lock:
+            lines.extend(metric.render())
+
+    collected = {}
+    for collect in collectors:
+        try:
+            samples = collect()
+        except Exception:  # збір не повинен ламати експорт решти метрик
+            continue
+        for name, type_name, help_text, labels, value in samples:
+            entry = collected.setdefault(name, (type_name, help_text, []))
+            entry[2].append((tuple(sorted(labels.items())), value))
+    for name, (type_name, help_text, samples) in collected.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {type_name}")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    """Атомарно записати метрики у файл (для textfile collector node_exporter)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def start_textfile_exporter(path, interval=15.0):
+    """Фоновий потік, що кожні interval секунд оновлює файл метрик."""
+    stop = threading.Event()
+
+    def loop():
+        while True:
+            try:
+                write_textfile(path)
+            except OSError:
+                pass
+            if stop.wait(interval):
+                return
+
+    threading.Thread(target=loop, name="metrics-textfile", daemon=True).start()
+    return stop
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Віддавати метрики на http://host:port/metrics у фоновому потоці."""
+    # http.server імпортується лише тут: cli.py і запуск програми його не потребують
+    import http.server
+
+    class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_from_env():
+    """
+    Увімкнути експорт за змінними середовища:
+    FURNITURE_METRICS_FILE (+ FURNITURE_METRICS_INTERVAL, с) та/або FURNITURE_METRICS_PORT.
+    """
+    path = os.environ.get("FURNITURE_METRICS_FILE")
+    if path:
+        interval = float(os.environ.get("FURNITURE_METRICS_INTERVAL", "15"))
+        start_textfile_exporter(path, interval)
+    port = os.environ.get("FURNITURE_METRICS_PORT")
+    if port:
+        start_http_server(int(port))
@@ -0,0 +1,330 @@
+# sale_queue.py
+"""
+Локальна черга продажів на випадок, коли БД заблокована іншою касою або
+тимчасово недоступна (наприклад, спільна БД на мережевому диску).
+
+Продаж дописується рядком JSON у локальний файл черги (append + fsync) —
+це мілісекунди й не потребує БД. replay() переносить продажі в БД
+пакетами через add_sale(): один пакет — одна транзакція, кожен продаж —
+у власній точці збереження. Кожен продаж має queue_id, унікальний у
+sales, тож повторне відтворення (наприклад, після збою між комітом і
+позначкою в черзі) не створює дублікатів.
+
+Продажі, які БД відхилила (недостатньо товару, товар видалено), переходять
+у список на розгляд: їх можна повторити (після поповнення складу) або
+відхилити.
+
+Файл черги лише дописується записами {"op": "sale" | "done" | "conflict" |
+"retry" | "dismiss", "id": ...}; коли незавершених продажів не лишилось,
+він очищується. Черга розрахована на одну програму на користувача й БД.
+"""
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import config
+from db import Money, add_log, add_sale, get_connection
+
+
+QUEUE_DIR = Path(os.environ.get("FURNITURE_QUEUE_DIR")
+                 or Path.home() / ".furniture_sales")
+BATCH_SIZE = 50          # продажів в одній транзакції відтворення
+COMPACT_RECORDS = 1000   # після стількох записів файл переписується без завершених
+SUBMIT_BUSY_MS = 300     # скільки продаж чекає на блокування БД, перш ніж піти в чергу
+
+# Стан продажу в черзі
+PENDING = "pending"
+CONFLICT = "conflict"
+
+
+def default_path():
+    """Файл черги для поточної БД (config.db_path()) у QUEUE_DIR."""
+    path = config.db_path()
+    if path == config.MEMORY:
+        name = f"memory_{os.getpid()}"
+    else:
+        digest = hashlib.sha1(os.fspath(path).encode("utf-8")).hexdigest()[:8]
+        name = f"{path.stem}_{digest}"
+    return QUEUE_DIR / f"{name}.queue.jsonl"
+
+
+def _now():
+    return datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+class SaleQueue:
+    """Черга продажів у файлі path (типово default_path())."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else default_path()
+        self._lock = threading.RLock()          # стан і файл черги
+        self._replay_lock = threading.Lock()    # одне відтворення за раз
+        self._entries = {}    # id -> запис "sale" + status, error
+        self._records = 0     # рядків у файлі
+        self._load()
+
+    # --- файл ------------------------------------------------------------------
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # недописаний рядок після збою
+                self._apply(record)
+                self._records += 1
+
+    def _apply(self, record):
+        op, entry_id = record.get("op"), record.get("id")
+        if op == "sale":
+            self._entries[entry_id] = dict(record, status=PENDING, error=None)
+            return
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return
+        if op in ("done", "dismiss"):
+            del self._entries[entry_id]
+        elif op == "conflict":
+            entry["status"], entry["error"] = CONFLICT, record.get("error")
+        elif op == "retry":
+            entry["status"], entry["error"] = PENDING, None
+
+    def _append(self, records):
+        """Дописати записи у файл і дочекатися їх запису на диск."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        for record in records:
+            self._apply(record)
+        self._records += len(records)
+
+    def _compact(self):
+        """Очистити файл, якщо все завершено, або переписати лише незавершені продажі."""
+        if self._entries and self._records < COMPACT_RECORDS:
+            return
+        records = []
+        for entry in self._entries.values():
+            records.append({k: v for k, v in entry.items() if k not in ("status", "error")})
+            if entry["status"] == CONFLICT:
+                records.append({"op": "conflict", "id": entry["id"], "error": entry["error"]})
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._records = len(records)
+
+    # --- черга ------------------------------------------------------------------
+
+    def enqueue(self, product_id, quantity, sale_price=None, customer_name=None,
+                discount_percent=0.0, customer_phone=None, product_label=None):
+        """
+        Зберегти продаж у черзі (дата — сьогодні). Аргументи — як в add_sale;
+        product_label — підпис товару для списку на розгляд. Повертає queue_id.
+        """
+        record = {
+            "op": "sale",
+            "id": uuid.uuid4().hex,
+            "queued_at": _now(),
+            "sale_date": datetime.date.today().isoformat(),
+            "product_id": int(product_id),
+            "product": product_label,
+            "quantity": int(quantity),
+            "sale_price": None if sale_price is None else str(Money.from_hryvnia(sale_price)),
+            "discount_percent": float(discount_percent or 0),
+            "customer_name": customer_name,
+            "customer_phone": customer_phone,
+        }
+        with self._lock:
+            self._append([record])
+        return record["id"]
+
+    def submit(self, product_id, quantity, sale_price=None, customer_name=None,
+               discount_percent=0.0, customer_phone=None, product_label=None):
+        """
+        Записати продаж одразу, а якщо БД заблокована чи недоступна довше
+        SUBMIT_BUSY_MS — зберегти в черзі. Поки в черзі є продажі, нові
+        стають за ними (порядок списання залишків). Повертає (sale_id, None)
+        або (None, queue_id); ValueError з add_sale (брак товару тощо)
+        передається викликачу.
+        """
+        sale = (product_id, quantity, sale_price, customer_name, discount_percent,
+                customer_phone)
+        if not self.has_pending():
+            try:
+                return self._write_now(sale), None
+            except sqlite3.OperationalError:
+                pass
+        return None, self.enqueue(*sale, product_label=product_label)
+
+    @staticmethod
+    def _write_now(sale):
+        conn = get_connection()
+        try:
+            conn.execute(f"PRAGMA busy_timeout = {SUBMIT_BUSY_MS}")
+            # Чекати на блокування можна лише тут і на COMMIT; з conn add_sale
+            # не повторює спроб (metrics.instrument), транзакція — наша
+            conn.execute("BEGIN IMMEDIATE")
+            sale_id = add_sale(*sale, conn=conn)
+            conn.commit()
+            return sale_id
+        finally:
+            conn.close()
+
+    def pending(self):
+        """Продажі, що чекають запису в БД, у порядку надходження."""
+        with self._lock:
+            return [e for e in self._entries.values() if e["status"] == PENDING]
+
+    def conflicts(self):
+        """Продажі, які БД відхилила, — список на розгляд."""
+        with self._lock:
+            return [e for e in self._entries.values() if e["status"] == CONFLICT]
+
+    def _status(self, entry_id):
+        entry = self._entries.get(entry_id)
+        return entry and entry["status"]
+
+    def has_pending(self):
+        with self._lock:
+            return any(e["status"] == PENDING for e in self._entries.values())
+
+    def retry(self, entry_id):
+        """Повернути продаж зі списку на розгляд у чергу."""
+        with self._lock:
+            if self._status(entry_id) == CONFLICT:
+                self._append([{"op": "retry", "id": entry_id}])
+
+    def dismiss(self, entry_id):
+        """Відхилити продаж зі списку на розгляд (у БД він не потрапить)."""
+        with self._lock:
+            if self._status(entry_id) == CONFLICT:
+                self._append([{"op": "dismiss", "id": entry_id, "at": _now()}])
+                self._compact()
+
+    def replay(self, batch_size=BATCH_SIZE):
+        """
+        Записати в БД до batch_size продажів з черги однією транзакцією.
+        Повертає (записано, конфліктів). sqlite3.OperationalError (БД
+        заблокована / недоступна) передається викликачу — черга не змінюється.
+        Поки триває запис у БД, enqueue() не чекає: стан черги блокується
+        лише на час читання пакета та дописування позначок.
+        """
+        with self._replay_lock:
+            batch = self.pending()[:batch_size]
+            if not batch:
+                return 0, 0
+            records = []
+            conn = get_connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for entry in batch:
+                    conn.execute("SAVEPOINT queued_sale")
+                    try:
+                        sale_id = add_sale(
+                            entry["product_id"], entry["quantity"], entry["sale_price"],
+                            entry["customer_name"], entry["discount_percent"],
+                            entry["customer_phone"], sale_date=entry["sale_date"],
+                            queue_id=entry["id"], conn=conn,
+                        )
+                    except (ValueError, sqlite3.IntegrityError) as e:
+                        conn.execute("ROLLBACK TO queued_sale")
+                        conn.execute("RELEASE queued_sale")
+                        records.append({"op": "conflict", "id": entry["id"],
+                                        "error": str(e), "at": _now()})
+                        add_log("queued_sale_conflict",
+                                f"product_id={entry['product_id']}, qty={entry['quantity']}: {e}",
+                                entity_type="product", entity_id=entry["product_id"],
+                                payload={"queue_id": entry["id"], "error": str(e)},
+                                conn=conn)
+                    else:
+                        conn.execute("RELEASE queued_sale")
+                        records.append({"op": "done", "id": entry["id"], "sale_id": sale_id})
+                conn.commit()
+            finally:
+                conn.close()
+
+            with self._lock:
+                self._append(records)
+                self._compact()
+            conflicts = sum(r["op"] == "conflict" for r in records)
+            return len(records) - conflicts, conflicts
+
+
+class ReplayScheduler:
+    """
+    Періодично відтворює чергу у фоновому потоці. Поки БД заблокована
+    або недоступна, інтервал між спробами подвоюється (від MIN_DELAY до
+    MAX_DELAY секунд). on_replayed(записано, конфліктів) викликається в
+    потоці Tk, коли щось змінилось.
+    """
+
+    CHECK_MS = 1000
+    MIN_DELAY = 2.0
+    MAX_DELAY = 60.0
+
+    def __init__(self, widget, queue, on_replayed=None):
+        self.widget = widget
+        self.queue = queue
+        self.on_replayed = on_replayed
+        self.delay = self.MIN_DELAY
+        self.last_error = None
+
+        self._next_try = 0.0
+        self._thread = None
+        self._result = None
+        widget.after(self.CHECK_MS, self._check)
+
+    def kick(self):
+        """Спробувати відтворення якнайшвидше (наприклад, після нового продажу в черзі)."""
+        self.delay = self.MIN_DELAY
+        self._next_try = 0.0
+
+    def _check(self):
+        try:
+            if self._thread is not None and not self._thread.is_alive():
+                self._thread = None
+                result, self._result = self._result, None
+                if result and any(result) and self.on_replayed is not None:
+                    self.on_replayed(*result)
+            if (self._thread is None and time.monotonic() >= self._next_try
+                    and self.queue.has_pending()):
+                self._thread = threading.Thread(
+                    target=self._run, name="sale-queue-replay", daemon=True
+                )
+                self._thread.start()
+        finally:
+            self.widget.after(self.CHECK_MS, self._check)
+
+    def _run(self):
+        done = conflicts = 0
+        try:
+            while True:
+                batch_done, batch_conflicts = self.queue.replay()
+                if not batch_done and not batch_conflicts:
+                    break
+                done += batch_done
+                conflicts += batch_conflicts
+        except (sqlite3.Error, OSError) as e:
+            self.last_error = e
+            self._next_try = time.monotonic() + self.delay
+            self.delay = min(self.delay * 2, self.MAX_DELAY)
+        else:
+            self.last_error = None
+            self.delay = self.MIN_DELAY
+        finally:
+            # Записані до помилки пакети теж показуються
+            self._result = (done, conflicts)
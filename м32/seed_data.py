@@ -1,7 +1,7 @@
 # seed_data.py
 import random
 
-from db import get_connection, add_log
+from db import Money, get_connection, add_log
 
 
 def seed_test_data():
@@ -54,7 +54,8 @@ def seed_test_data():
             width = random.choice([60, 80, 100, 120, 140, 160, 180, 200])
             height = random.choice([40, 50, 75, 90, 200])
             depth = random.choice([35, 40, 45, 60])
-            base_price = random.choice([2500, 3200, 4500, 5200, 6300, 7800, 9100])
+            base_price = Money.from_hryvnia(
+                random.choice([2500, 3200, 4500, 5200, 6300, 7800, 9100]))
             stock_qty = random.randint(0, 20)
             products_data.append(
                 (name, cat, material, color, width, height, depth, base_price, stock_qty)
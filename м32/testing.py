@@ -0,0 +1,109 @@
+# testing.py
+"""
+Тестові БД у пам'яті для тестів і бенчмарків.
+
+Шаблон (схема + тестові товари + sales випадкових продажів) будується
+один раз і зберігається у файлі в тимчасовій теці. Кожен виклик
+memory_db() копіює шаблон у нову спільну БД у пам'яті через backup API —
+це мілісекунди замість повторного init_db() і заповнення.
+
+    with memory_db(sales=10_000):
+        assert db.list_sales(5)
+"""
+import datetime
+import random
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import config
+import db
+from seed_data import seed_test_data
+
+
+TEMPLATE_DIR = Path(tempfile.gettempdir()) / "furniture_templates"
+# Збільшується, коли змінюється наповнення шаблону (старі шаблони перебудовуються)
+TEMPLATE_REVISION = 2
+
+
+def fill_sales(sales_count, seed=2):
+    """
+    Додати sales_count випадкових продажів за останні ~3 роки.
+    Покупці створюються в довіднику й зв'язуються з продажами, як в add_sale.
+    """
+    rng = random.Random(seed)
+    with db.get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM products")
+        product_ids = [row[0] for row in cur.fetchall()]
+        today = datetime.date.today()
+        customers = {}
+        rows = []
+        for _ in range(sales_count):
+            day = today - datetime.timedelta(days=rng.randint(0, 3 * 365))
+            customer = f"Покупець {rng.randint(1, 5000)}"
+            if customer not in customers:
+                customers[customer] = db.get_or_create_customer(customer, conn=conn)
+            rows.append((
+                rng.choice(product_ids), rng.randint(1, 3),
+                db.Money.from_hryvnia(rng.choice([2500, 3200, 4500, 5200])), 0,
+                day.isoformat(), customer, customers[customer],
+            ))
+        cur.executemany("""
+            INSERT INTO sales (product_id, quantity, sale_price,
+                               discount_percent, sale_date, customer_name,
+                               customer_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+
+
+def template_path(sales=0):
+    """Шлях до кешованого шаблону (версія схеми та дата входять в ім'я)."""
+    return TEMPLATE_DIR / (
+        f"template_v{db.SCHEMA_VERSION}r{TEMPLATE_REVISION}_{sales}"
+        f"_{datetime.date.today():%Y%m%d}.db"
+    )
+
+
+def build_template(sales=0, rebuild=False):
+    """Створити шаблон, якщо його ще немає (або rebuild=True). Повертає шлях."""
+    path = template_path(sales)
+    if path.exists() and not rebuild:
+        return path
+    TEMPLATE_DIR.mkdir(parents=True, exist_ok=True)
+    # Шаблони попередніх днів / версій схеми з тією ж кількістю продажів
+    for old in TEMPLATE_DIR.glob(f"template_v*_{sales}_*.db"):
+        old.unlink(missing_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+
+    with config.using(db_path=tmp):
+        db.init_db()
+        seed_test_data()
+        if sales:
+            fill_sales(sales)
+    tmp.replace(path)
+    return path
+
+
+@contextmanager
+def memory_db(sales=0):
+    """
+    Тимчасово переключити config на нову БД у пам'яті, заповнену з шаблону.
+    Повертає з'єднання з цією БД; після виходу попередні налаштування
+    відновлюються, а БД у пам'яті звільняється.
+    """
+    template = build_template(sales)
+    with config.using(db_path=config.MEMORY):
+        conn = db.get_connection()
+        source = sqlite3.connect(template.resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+        try:
+            yield conn
+        finally:
+            conn.close()
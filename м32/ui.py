@@ -1,20 +1,122 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import csv
+import datetime
+import threading
+import time
 
 from db import (
-    list_products,
+    Money,
+    ProductRow,
+    iter_products,
     list_products_filtered,
-    list_sales,
+    nearest_products_by_size,
+    preview_bulk_update,
+    bulk_update_products,
     list_sales_filtered,
-    report_total_by_day,
+    sales_summary,
+    iter_total_by_day,
     add_product,
-    add_sale,
     update_product,
     delete_product,
-    list_logs,
+    search_logs,
+    list_log_values,
+    find_customers,
+    customer_history,
+    normalize_customer_name,
+    archive_closed_years,
 )
 from seed_data import seed_test_data
+import metrics
+from charts import RevenueChart, CategoryChart
+from federation import consolidate
+from live_filter import LiveFilter, like_contains, substr_refines, range_refines
+from maintenance import MaintenanceScheduler
+from sale_queue import ReplayScheduler, SaleQueue
+
+SALES_LIMIT = 200
+LOGS_PAGE_SIZE = 200
+
+
+# (ключ фільтра, поле ProductRow) для діапазонних полів
+_PRODUCT_RANGES = (
+    ("price", "base_price"),
+    ("width", "width"),
+    ("height", "height"),
+    ("depth", "depth"),
+)
+
+
+def _product_filter_refines(new, old):
+    return (substr_refines(new["name_substr"], old["name_substr"])
+            and substr_refines(new["category"], old["category"])
+            and all(range_refines(new[f"{key}_min"], new[f"{key}_max"],
+                                  old[f"{key}_min"], old[f"{key}_max"])
+                    for key, _index in _PRODUCT_RANGES))
+
+
+def _in_range(value, low, high):
+    if low is None and high is None:
+        return True
+    if value is None:
+        return False
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def _product_row_matches(row, f):
+    return (like_contains(row.name, f["name_substr"])
+            and like_contains(row.category, f["category"])
+            and all(_in_range(getattr(row, field), f[f"{key}_min"], f[f"{key}_max"])
+                    for key, field in _PRODUCT_RANGES))
+
+
+def _customer_refines(new, old):
+    # Пошук за телефоном не перевіряється локально — лише запитом до БД
+    if new == old or not old:
+        return True
+    if not new or any(ch.isdigit() for ch in new):
+        return False
+    return normalize_customer_name(old) in normalize_customer_name(new)
+
+
+def _customer_matches(value, substr):
+    if not substr:
+        return True
+    return normalize_customer_name(substr) in (normalize_customer_name(value) or "")
+
+
+def _sales_filter_refines(new, old):
+    return (substr_refines(new["name_substr"], old["name_substr"])
+            and _customer_refines(new["customer_substr"], old["customer_substr"])
+            and range_refines(new["date_from"], new["date_to"],
+                              old["date_from"], old["date_to"]))
+
+
+def _sales_row_matches(row, f):
+    date = row.sale_date
+    return (like_contains(row.product_name, f["name_substr"])
+            and _customer_matches(row.customer_name, f["customer_substr"])
+            and (f["date_from"] is None or date >= f["date_from"])
+            and (f["date_to"] is None or date <= f["date_to"]))
+
+
+def _parse_optional_float(raw):
+    raw = raw.strip()
+    return float(raw.replace(",", ".")) if raw else None
+
+
+def _parse_optional_money(raw):
+    """Сума в гривнях з поля введення -> Money (порівнюється з цінами рядків)."""
+    raw = raw.strip()
+    return Money.from_hryvnia(raw) if raw else None
+
+
+def _parse_optional_date(raw):
+    raw = raw.strip()
+    if not raw:
+        return None
+    return datetime.date.fromisoformat(raw).isoformat()
+
 
 class FurnitureApp(tk.Tk):
     def __init__(self):
@@ -36,16 +138,76 @@ class FurnitureApp(tk.Tk):
         self.notebook.add(self.logs_frame, text="Журнал")
 
         self.selected_product_id = None
-
-        self.create_products_tab()
-        self.create_sales_tab()
-        self.create_reports_tab()
-        self.create_logs_tab()
-
-        self.refresh_products()
-        self.refresh_sales()
-        self.refresh_reports()
-        self.refresh_logs()
+        self.products_for_combo = {}
+
+        # Вкладки будуються та заповнюються лише при першому показі;
+        # після змін даних вкладка позначається застарілою і оновлюється,
+        # коли користувач на неї перейде.
+        self._tabs = {
+            str(self.products_frame): ("products", self.create_products_tab, self.refresh_products),
+            str(self.sales_frame): ("sales", self.create_sales_tab, self.refresh_sales_tab),
+            str(self.reports_frame): ("reports", self.create_reports_tab, self.refresh_reports),
+            str(self.logs_frame): ("logs", self.create_logs_tab, self.refresh_logs),
+        }
+        self._built_tabs = set()
+        self._stale_tabs = {key for key, _build, _refresh in self._tabs.values()}
+        # Товари й продажі оновлюються через LiveFilter: тривалість оновлення
+        # (UI_REFRESH_SECONDS) фіксується, коли результат показано
+        self._async_tabs = {"products", "sales"}
+        self._refresh_started = {}
+
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.show_current_tab()
+
+        # Обслуговування БД у простої та коротке — при закритті вікна
+        self.maintenance = MaintenanceScheduler(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Продажі, які не вдалося записати одразу (БД заблокована / недоступна),
+        # чекають у локальній черзі й записуються у фоні
+        self.sale_queue = SaleQueue()
+        self.sale_replay = ReplayScheduler(self, self.sale_queue,
+                                           on_replayed=self.on_queue_replayed)
+
+    def on_close(self):
+        try:
+            self.maintenance.shutdown()
+        finally:
+            self.destroy()
+
+    def on_tab_changed(self, event):
+        self.show_current_tab()
+
+    def show_current_tab(self):
+        """Побудувати (за потреби) та оновити видиму вкладку, якщо вона застаріла."""
+        key, build, refresh = self._tabs[self.notebook.select()]
+        if key not in self._built_tabs:
+            build()
+            self._built_tabs.add(key)
+        if key in self._stale_tabs:
+            self._stale_tabs.discard(key)
+            start = time.perf_counter()
+            refresh()
+            if key in self._async_tabs:
+                self._refresh_started[key] = start
+            else:
+                metrics.UI_REFRESH_SECONDS.observe(time.perf_counter() - start, tab=key)
+
+    def _refresh_done(self, key):
+        """Результат LiveFilter показано: завершити вимір оновлення вкладки key."""
+        start = self._refresh_started.pop(key, None)
+        if start is not None:
+            metrics.UI_REFRESH_SECONDS.observe(time.perf_counter() - start, tab=key)
+
+    def show_query_error(self, error):
+        """Помилка фонового запиту фільтра (LiveFilter)."""
+        self._refresh_started.clear()
+        messagebox.showerror("Помилка", f"Не вдалося отримати дані: {error}")
+
+    def invalidate(self, *keys):
+        """Позначити вкладки застарілими; видима вкладка оновлюється одразу."""
+        self._stale_tabs.update(keys)
+        self.show_current_tab()
 
 
     def create_products_tab(self):
@@ -97,15 +259,54 @@ class FurnitureApp(tk.Tk):
         self.filter_price_max_entry = ttk.Entry(filter_frame, width=10)
         self.filter_price_max_entry.grid(row=1, column=3, padx=5, pady=2, sticky="w")
 
+        ttk.Label(filter_frame, text="Ш×В×Г від, см:").grid(row=2, column=0, padx=5, pady=2, sticky="e")
+        ttk.Label(filter_frame, text="до (вміщується в):").grid(row=3, column=0, padx=5, pady=2, sticky="e")
+        self.filter_dim_entries = {}
+        for col, axis in enumerate(("width", "height", "depth")):
+            for row, bound in ((2, "min"), (3, "max")):
+                entry = ttk.Entry(filter_frame, width=10)
+                entry.grid(row=row, column=col + 1, padx=5, pady=2, sticky="w")
+                self.filter_dim_entries[f"{axis}_{bound}"] = entry
+
         filter_btn = ttk.Button(filter_frame, text="Застосувати фільтр", command=self.refresh_products)
         filter_btn.grid(row=0, column=4, padx=5, pady=2)
 
+        nearest_btn = ttk.Button(filter_frame, text="Найближчі за розміром", command=self.on_nearest_size)
+        nearest_btn.grid(row=2, column=4, padx=5, pady=2)
+
+        for entry in (self.filter_name_entry, self.filter_category_entry,
+                      self.filter_price_min_entry, self.filter_price_max_entry,
+                      *self.filter_dim_entries.values()):
+            entry.bind("<KeyRelease>", self.on_product_filter_changed)
+
         reset_btn = ttk.Button(filter_frame, text="Скинути", command=self.reset_product_filters)
         reset_btn.grid(row=1, column=4, padx=5, pady=2)
 
+        # Масова зміна ціни / залишку для всіх товарів за поточним фільтром
+        bulk_frame = ttk.LabelFrame(self.products_frame, text="Масова зміна (товари за фільтром)")
+        bulk_frame.pack(side="top", fill="x", padx=10, pady=5)
+
+        ttk.Label(bulk_frame, text="Ціна ±:").grid(row=0, column=0, padx=5, pady=2, sticky="e")
+        self.bulk_price_entry = ttk.Entry(bulk_frame, width=10)
+        self.bulk_price_entry.grid(row=0, column=1, padx=5, pady=2, sticky="w")
+        self.bulk_price_mode = ttk.Combobox(bulk_frame, values=("%", "грн"),
+                                            width=5, state="readonly")
+        self.bulk_price_mode.set("%")
+        self.bulk_price_mode.grid(row=0, column=2, padx=5, pady=2, sticky="w")
+
+        ttk.Label(bulk_frame, text="Залишок ±, шт:").grid(row=0, column=3, padx=5, pady=2, sticky="e")
+        self.bulk_stock_entry = ttk.Entry(bulk_frame, width=10)
+        self.bulk_stock_entry.grid(row=0, column=4, padx=5, pady=2, sticky="w")
+
+        ttk.Button(bulk_frame, text="Переглянути…", command=self.on_bulk_preview)\
+            .grid(row=0, column=5, padx=5, pady=2)
+        ttk.Button(bulk_frame, text="Застосувати", command=self.on_bulk_apply)\
+            .grid(row=0, column=6, padx=5, pady=2)
+
         # Таблиця товарів
         list_frame = ttk.LabelFrame(self.products_frame, text="Каталог меблів")
         list_frame.pack(side="top", fill="both", expand=True, padx=10, pady=10)
+        self.products_list_frame = list_frame
 
         columns = ("id", "name", "category", "material", "color",
                    "size", "price", "stock")
@@ -135,19 +336,28 @@ class FurnitureApp(tk.Tk):
 
         self.products_tree.bind("<<TreeviewSelect>>", self.on_product_select)
 
+        self.products_filter = LiveFilter(
+            self,
+            query=lambda f, conn: list_products_filtered(**f, conn=conn),
+            on_result=self.show_products,
+            on_error=self.show_query_error,
+            refines=_product_filter_refines,
+            match=_product_row_matches,
+        )
+
     def on_seed_data(self):
         seed_test_data()
         messagebox.showinfo("Готово", "Базу заповнено тестовими меблями (якщо вона була порожня).")
-        self.refresh_products()
-        self.refresh_sales()
-        self.refresh_reports()
-        self.refresh_logs()
+        self.invalidate("products", "sales", "reports", "logs")
 
     def reset_product_filters(self):
         self.filter_name_entry.delete(0, tk.END)
         self.filter_category_entry.delete(0, tk.END)
         self.filter_price_min_entry.delete(0, tk.END)
         self.filter_price_max_entry.delete(0, tk.END)
+        for entry in self.filter_dim_entries.values():
+            entry.delete(0, tk.END)
+        self.products_list_frame.config(text="Каталог меблів")
         self.refresh_products()
 
     def on_product_select(self, event):
@@ -221,7 +431,7 @@ class FurnitureApp(tk.Tk):
         if not base_price_raw:
             raise ValueError("Базова ціна обов'язкова.")
 
-        base_price = float(base_price_raw.replace(",", "."))
+        base_price = Money.from_hryvnia(base_price_raw)
         stock_qty = int(stock_raw) if stock_raw else 0
 
         return name, category, material, color, width, height, depth, base_price, stock_qty
@@ -231,8 +441,7 @@ class FurnitureApp(tk.Tk):
             data = self._read_product_form()
             add_product(*data)
             messagebox.showinfo("Успіх", "Новий товар додано.")
-            self.refresh_products()
-            self.refresh_logs()
+            self.invalidate("products", "sales", "reports", "logs")
         except ValueError as e:
             messagebox.showerror("Помилка", f"Невірні дані: {e}")
 
@@ -244,8 +453,7 @@ class FurnitureApp(tk.Tk):
             data = self._read_product_form()
             update_product(self.selected_product_id, *data)
             messagebox.showinfo("Успіх", "Дані товару оновлено.")
-            self.refresh_products()
-            self.refresh_logs()
+            self.invalidate("products", "sales", "reports", "logs")
         except ValueError as e:
             messagebox.showerror("Помилка", f"Невірні дані: {e}")
 
@@ -259,42 +467,153 @@ class FurnitureApp(tk.Tk):
             delete_product(self.selected_product_id)
             messagebox.showinfo("Успіх", "Товар видалено.")
             self.selected_product_id = None
-            self.refresh_products()
-            self.refresh_logs()
+            self.invalidate("products", "sales", "reports", "logs")
         except ValueError as e:
             messagebox.showerror("Помилка", str(e))
 
+    def _read_product_filters(self):
+        return {
+            "name_substr": self.filter_name_entry.get().strip() or None,
+            "category": self.filter_category_entry.get().strip() or None,
+            "price_min": _parse_optional_money(self.filter_price_min_entry.get()),
+            "price_max": _parse_optional_money(self.filter_price_max_entry.get()),
+            **{key: _parse_optional_float(entry.get())
+               for key, entry in self.filter_dim_entries.items()},
+        }
+
+    def _read_bulk_changes(self):
+        price = _parse_optional_float(self.bulk_price_entry.get())
+        stock = self.bulk_stock_entry.get().strip()
+        percent = self.bulk_price_mode.get() == "%"
+        return {
+            "price_percent": price if percent else None,
+            "price_delta": None if percent else price,
+            "stock_delta": int(stock) if stock else None,
+        }
+
+    def _read_bulk_request(self):
+        """(зміни, фільтри) або None, якщо введення невірне (з повідомленням)."""
+        try:
+            filters = self._read_product_filters()
+        except ValueError:
+            messagebox.showerror("Помилка", "Невірний діапазон цін або розмірів у фільтрі.")
+            return None
+        try:
+            changes = self._read_bulk_changes()
+        except ValueError:
+            messagebox.showerror("Помилка", "Зміна ціни — число, зміна залишку — ціле число.")
+            return None
+        return changes, filters
+
+    def on_bulk_preview(self):
+        request = self._read_bulk_request()
+        if request is None:
+            return
+        changes, filters = request
+        try:
+            rows = preview_bulk_update(**changes, **filters)
+        except ValueError as e:
+            messagebox.showerror("Помилка", str(e))
+            return
+
+        win = tk.Toplevel(self)
+        win.title("Масова зміна — попередній перегляд")
+        win.geometry("900x450")
+        _frame, tree = self._make_tree(win, f"Буде змінено товарів: {len(rows)}", {
+            "id": "ID",
+            "name": "Назва",
+            "category": "Категорія",
+            "old_price": "Ціна, грн",
+            "new_price": "Нова ціна, грн",
+            "old_stock": "Залишок",
+            "new_stock": "Новий залишок",
+        }, height=15)
+        for pid, name, category, old_price, new_price, old_stock, new_stock in rows:
+            tree.insert("", "end", values=(pid, name, category, f"{old_price:.2f}",
+                                           f"{new_price:.2f}", old_stock, new_stock))
+
+    def on_bulk_apply(self):
+        request = self._read_bulk_request()
+        if request is None:
+            return
+        changes, filters = request
+        try:
+            count = len(preview_bulk_update(**changes, **filters))
+        except ValueError as e:
+            messagebox.showerror("Помилка", str(e))
+            return
+        if count == 0:
+            messagebox.showinfo("Масова зміна", "Жоден товар не відповідає фільтру.")
+            return
+        if not messagebox.askyesno("Підтвердження",
+                                   f"Змінити ціну / залишок для {count} товарів?"):
+            return
+        try:
+            updated = bulk_update_products(**changes, **filters)
+        except ValueError as e:
+            messagebox.showerror("Помилка", str(e))
+            return
+        self.bulk_price_entry.delete(0, tk.END)
+        self.bulk_stock_entry.delete(0, tk.END)
+        messagebox.showinfo("Масова зміна", f"Змінено товарів: {updated}.")
+        self.invalidate("products", "sales", "reports", "logs")
+
+    def on_product_filter_changed(self, event):
+        try:
+            filters = self._read_product_filters()
+        except ValueError:
+            return  # ціна ще вводиться
+        self.products_list_frame.config(text="Каталог меблів")
+        self.products_filter.schedule(filters)
+
     def refresh_products(self):
-        # читаємо фільтри
-        name = self.filter_name_entry.get().strip()
-        cat = self.filter_category_entry.get().strip()
-        pmin_raw = self.filter_price_min_entry.get().strip()
-        pmax_raw = self.filter_price_max_entry.get().strip()
+        try:
+            filters = self._read_product_filters()
+        except ValueError:
+            messagebox.showerror("Помилка", "Невірний діапазон цін або розмірів у фільтрі.")
+            return
+        self.products_list_frame.config(text="Каталог меблів")
+        self.products_filter.run_now(filters)
+
+    def on_nearest_size(self):
+        """Товари, найближчі до розміру з полів «до» (або «від»), з іншими фільтрами."""
+        try:
+            filters = self._read_product_filters()
+        except ValueError:
+            messagebox.showerror("Помилка", "Невірний діапазон цін або розмірів у фільтрі.")
+            return
+        target = []
+        for axis in ("width", "height", "depth"):
+            value = filters.pop(f"{axis}_max")
+            low = filters.pop(f"{axis}_min")
+            target.append(value if value is not None else low)
+        if None in target:
+            messagebox.showerror("Помилка", "Вкажіть ширину, висоту та глибину.")
+            return
 
-        pmin = float(pmin_raw.replace(",", ".")) if pmin_raw else None
-        pmax = float(pmax_raw.replace(",", ".")) if pmax_raw else None
+        rows = nearest_products_by_size(*target, limit=20, **filters)
+        # Наступна зміна фільтра має знову запитати каталог, а не звузити кеш
+        self.products_filter.cancel()
+        self.products_list_frame.config(
+            text="Каталог меблів — найближчі до {:g}×{:g}×{:g} см".format(*target)
+        )
+        # Останнє поле — відстань до заданого розміру
+        self.show_products(ProductRow._make(row[:-1]) for row in rows)
 
+    def show_products(self, products):
         for row in self.products_tree.get_children():
             self.products_tree.delete(row)
 
-        products = list_products_filtered(
-            name_substr=name or None,
-            category=cat or None,
-            price_min=pmin,
-            price_max=pmax,
-        )
-        for (pid, name, category, material, color,
-             width, height, depth, price, stock) in products:
+        for p in products:
             size_str = ""
-            if width and height and depth:
-                size_str = f"{width:.0f}x{height:.0f}x{depth:.0f}"
+            if p.width and p.height and p.depth:
+                size_str = f"{p.width:.0f}x{p.height:.0f}x{p.depth:.0f}"
             self.products_tree.insert(
                 "", "end",
-                values=(pid, name, category, material or "-", color or "-",
-                        size_str, f"{price:.2f}", stock)
+                values=(p.id, p.name, p.category, p.material or "-", p.color or "-",
+                        size_str, f"{p.base_price:.2f}", p.stock_qty)
             )
-
-        self.refresh_product_choices()
+        self._refresh_done("products")
 
 
 
@@ -323,8 +642,17 @@ class FurnitureApp(tk.Tk):
         self.customer_entry = ttk.Entry(form_frame, width=25)
         self.customer_entry.grid(row=4, column=1, sticky="w", padx=5, pady=2)
 
+        ttk.Label(form_frame, text="Телефон покупця (опц.):").grid(row=5, column=0, sticky="e", padx=5, pady=2)
+        self.customer_phone_entry = ttk.Entry(form_frame, width=25)
+        self.customer_phone_entry.grid(row=5, column=1, sticky="w", padx=5, pady=2)
+
         add_sale_btn = ttk.Button(form_frame, text="Зареєструвати продаж", command=self.on_add_sale)
-        add_sale_btn.grid(row=5, column=0, columnspan=2, pady=10)
+        add_sale_btn.grid(row=6, column=0, columnspan=2, pady=10)
+
+        self.queue_status_label = ttk.Label(form_frame, text="")
+        self.queue_status_label.grid(row=7, column=0, columnspan=2, sticky="w", padx=5)
+        queue_btn = ttk.Button(form_frame, text="Черга продажів…", command=self.on_sale_queue)
+        queue_btn.grid(row=7, column=2, padx=5, pady=2)
 
         # Фільтр продажів
         filter_frame = ttk.LabelFrame(self.sales_frame, text="Фільтр продажів")
@@ -349,9 +677,20 @@ class FurnitureApp(tk.Tk):
         filter_btn = ttk.Button(filter_frame, text="Застосувати фільтр", command=self.refresh_sales)
         filter_btn.grid(row=0, column=4, padx=5, pady=2)
 
+        for entry in (self.sales_filter_name, self.sales_filter_customer,
+                      self.sales_filter_from, self.sales_filter_to):
+            entry.bind("<KeyRelease>", self.on_sales_filter_changed)
+
         reset_btn = ttk.Button(filter_frame, text="Скинути", command=self.reset_sales_filters)
         reset_btn.grid(row=1, column=4, padx=5, pady=2)
 
+        history_btn = ttk.Button(filter_frame, text="Історія покупця", command=self.on_customer_history)
+        history_btn.grid(row=0, column=5, padx=5, pady=2)
+
+        # Підсумки за весь фільтр (не лише за показані рядки)
+        self.sales_summary_label = ttk.Label(self.sales_frame, text="", anchor="w")
+        self.sales_summary_label.pack(side="bottom", fill="x", padx=10, pady=(0, 10))
+
         # Таблиця продажів
         list_frame = ttk.LabelFrame(self.sales_frame, text="Останні продажі")
         list_frame.pack(side="top", fill="both", expand=True, padx=10, pady=10)
@@ -380,6 +719,23 @@ class FurnitureApp(tk.Tk):
         self.sales_tree.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side="right", fill="y")
 
+        self.sales_filter = LiveFilter(
+            self,
+            query=lambda f, conn: list_sales_filtered(**f, limit=SALES_LIMIT, conn=conn),
+            on_result=self.show_sales,
+            on_error=self.show_query_error,
+            refines=_sales_filter_refines,
+            match=_sales_row_matches,
+            limit=SALES_LIMIT,
+        )
+        # Підсумки завжди рахує БД (агрегати не звужуються локально)
+        self.sales_summary_filter = LiveFilter(
+            self,
+            query=lambda f, conn: sales_summary(**f, conn=conn),
+            on_result=self.show_sales_summary,
+            on_error=self.show_query_error,
+        )
+
     def reset_sales_filters(self):
         self.sales_filter_name.delete(0, tk.END)
         self.sales_filter_customer.delete(0, tk.END)
@@ -388,10 +744,9 @@ class FurnitureApp(tk.Tk):
         self.refresh_sales()
 
     def refresh_product_choices(self):
-        products = list_products()
         self.products_for_combo = {
-            f"{pid}: {name} ({category})": pid
-            for (pid, name, category, *_rest) in products
+            f"{p.id}: {p.name} ({p.category})": p.id
+            for p in iter_products()
         }
         self.product_combo["values"] = list(self.products_for_combo.keys())
 
@@ -408,47 +763,256 @@ class FurnitureApp(tk.Tk):
 
             qty = int(self.sale_qty_entry.get())
             price_raw = self.sale_price_entry.get().strip()
-            sale_price = float(price_raw.replace(",", ".")) if price_raw else None
+            sale_price = Money.from_hryvnia(price_raw) if price_raw else None
 
             disc_raw = self.discount_entry.get().strip()
             discount_percent = float(disc_raw.replace(",", ".")) if disc_raw else 0.0
 
             customer_name = self.customer_entry.get().strip() or None
+            customer_phone = self.customer_phone_entry.get().strip() or None
 
-            add_sale(product_id, qty, sale_price, customer_name, discount_percent)
+            # Якщо БД зайнята довше кількох сотень мс — продаж іде в чергу
+            try:
+                sale_id, _ = self.sale_queue.submit(
+                    product_id, qty, sale_price, customer_name, discount_percent,
+                    customer_phone, product_label=product_label,
+                )
+            except OSError as e:
+                messagebox.showerror("Помилка",
+                                     f"БД недоступна, і продаж не вдалося зберегти в черзі: {e}")
+                return
+            if sale_id is None:
+                self.sale_replay.kick()
+                self.update_queue_status()
+                messagebox.showinfo(
+                    "Продаж у черзі",
+                    "БД зараз зайнята або недоступна. Продаж збережено й буде записано автоматично.",
+                )
+                return
             messagebox.showinfo("Успіх", "Продаж зареєстровано.")
-            self.refresh_products()
-            self.refresh_sales()
-            self.refresh_reports()
-            self.refresh_logs()
+            self.invalidate("products", "sales", "reports", "logs")
         except ValueError as e:
             messagebox.showerror("Помилка", str(e))
 
+    def update_queue_status(self):
+        if "sales" not in self._built_tabs:
+            return
+        pending = len(self.sale_queue.pending())
+        conflicts = len(self.sale_queue.conflicts())
+        parts = []
+        if pending:
+            parts.append(f"у черзі: {pending}")
+        if conflicts:
+            parts.append(f"на розгляді: {conflicts}")
+        self.queue_status_label.config(text=("Продажі " + ", ".join(parts)) if parts else "")
+
+    def on_queue_replayed(self, done, conflicts):
+        self.update_queue_status()
+        if done:
+            self.invalidate("products", "sales", "reports", "logs")
+        if conflicts:
+            messagebox.showwarning(
+                "Черга продажів",
+                f"Не вдалося записати продажів з черги: {conflicts}. "
+                "Перегляньте їх у вікні «Черга продажів…».",
+            )
+
+    def on_sale_queue(self):
+        """Продажі в черзі та список на розгляд (відхилені БД) з повтором / відхиленням."""
+        win = tk.Toplevel(self)
+        win.title("Черга продажів")
+        win.geometry("1000x450")
+
+        status = ttk.Label(win, text="")
+        status.pack(side="top", anchor="w", padx=10, pady=5)
+        buttons = ttk.Frame(win)
+        buttons.pack(side="bottom", fill="x", padx=10, pady=5)
+
+        _frame, tree = self._make_tree(win, "Продажі, які ще не записані в БД", {
+            "queued": "Прийнято",
+            "name": "Товар",
+            "qty": "К-сть",
+            "price": "Ціна, грн",
+            "discount": "Знижка, %",
+            "customer": "Покупець",
+            "state": "Стан",
+        }, height=12)
+        tree.column("state", width=300, anchor="w")
+
+        def fill():
+            for row in tree.get_children():
+                tree.delete(row)
+            for entry in self.sale_queue.pending() + self.sale_queue.conflicts():
+                tree.insert("", "end", iid=entry["id"], values=(
+                    entry["queued_at"], entry["product"] or entry["product_id"],
+                    entry["quantity"], entry["sale_price"] or "базова",
+                    f"{entry['discount_percent']:.1f}", entry["customer_name"] or "-",
+                    entry["error"] or "очікує запису",
+                ))
+            error = self.sale_replay.last_error
+            status.config(text=f"Остання спроба запису: {error}" if error else "")
+            self.update_queue_status()
+
+        def selected():
+            ids = tree.selection()
+            if not ids:
+                messagebox.showerror("Помилка", "Оберіть продаж зі списку на розгляд.", parent=win)
+            return ids
+
+        def on_retry():
+            for entry_id in selected():
+                self.sale_queue.retry(entry_id)
+            self.sale_replay.kick()
+            fill()
+
+        def on_dismiss():
+            ids = selected()
+            if not ids or not messagebox.askyesno(
+                    "Підтвердження", "Відхилити вибрані продажі? У БД вони не потраплять.",
+                    parent=win):
+                return
+            for entry_id in ids:
+                self.sale_queue.dismiss(entry_id)
+            fill()
+
+        ttk.Button(buttons, text="Повторити запис", command=on_retry).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Відхилити", command=on_dismiss).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Оновити", command=fill).pack(side="left", padx=5)
+        fill()
+
+    def refresh_sales_tab(self):
+        self.refresh_product_choices()
+        self.refresh_sales()
+        self.update_queue_status()
+
+    def _read_sales_filters(self):
+        return {
+            "name_substr": self.sales_filter_name.get().strip() or None,
+            "customer_substr": self.sales_filter_customer.get().strip() or None,
+            "date_from": _parse_optional_date(self.sales_filter_from.get()),
+            "date_to": _parse_optional_date(self.sales_filter_to.get()),
+        }
+
+    def on_sales_filter_changed(self, event):
+        try:
+            filters = self._read_sales_filters()
+        except ValueError:
+            return  # дата ще вводиться
+        self.sales_filter.schedule(filters)
+        self.sales_summary_filter.schedule(filters)
+
     def refresh_sales(self):
-        name = self.sales_filter_name.get().strip()
-        customer = self.sales_filter_customer.get().strip()
-        d_from = self.sales_filter_from.get().strip()
-        d_to = self.sales_filter_to.get().strip()
+        try:
+            filters = self._read_sales_filters()
+        except ValueError:
+            messagebox.showerror("Помилка", "Дата має бути у форматі РРРР-ММ-ДД.")
+            return
+        self.sales_filter.run_now(filters)
+        self.sales_summary_filter.run_now(filters)
 
+    def show_sales(self, sales):
         for row in self.sales_tree.get_children():
             self.sales_tree.delete(row)
 
-        sales = list_sales_filtered(
-            name_substr=name or None,
-            date_from=d_from or None,
-            date_to=d_to or None,
-            customer_substr=customer or None,
-            limit=200,
-        )
-        for (sid, date, name, category, qty, price,
-             discount, total, customer) in sales:
+        for s in sales:
             self.sales_tree.insert(
                 "", "end",
-                values=(sid, date, name, category, qty,
-                        f"{price:.2f}", f"{discount:.1f}", f"{total:.2f}", customer or "-")
+                values=(s.id, s.sale_date, s.product_name, s.category, s.quantity,
+                        f"{s.sale_price:.2f}", f"{s.discount_percent:.1f}",
+                        f"{s.total:.2f}", s.customer_name or "-")
             )
+        self._refresh_done("sales")
+
+    def show_sales_summary(self, summary):
+        receipts, units, revenue, avg_discount = summary
+        self.sales_summary_label.config(
+            text=f"За фільтром: чеків {receipts}, одиниць {units}, "
+                 f"виручка {revenue:.2f} грн, середня знижка {avg_discount:.1f}%"
+        )
+
+
+
+    def on_customer_history(self):
+        """Вікно з покупцями (за фільтром «Покупець») та їхньою історією покупок."""
+        win = tk.Toplevel(self)
+        win.title("Історія покупця")
+        win.geometry("900x500")
+
+        customers_frame = ttk.LabelFrame(win, text="Покупці")
+        customers_frame.pack(side="top", fill="x", padx=10, pady=5)
+
+        columns = ("name", "phone", "purchases", "units", "ltv", "first", "last")
+        customers_tree = ttk.Treeview(customers_frame, columns=columns, show="headings", height=6)
+        customers_tree.pack(side="left", fill="both", expand=True)
+        headings = {
+            "name": "Покупець",
+            "phone": "Телефон",
+            "purchases": "Покупок",
+            "units": "Одиниць",
+            "ltv": "Сума покупок, грн",
+            "first": "Перша",
+            "last": "Остання",
+        }
+        for col, text in headings.items():
+            customers_tree.heading(col, text=text)
+            customers_tree.column(col, width=160 if col == "name" else 100, anchor="center")
+
+        history_frame = ttk.LabelFrame(win, text="Покупки")
+        history_frame.pack(side="top", fill="both", expand=True, padx=10, pady=5)
+
+        columns = ("date", "name", "qty", "price", "discount", "total")
+        history_tree = ttk.Treeview(history_frame, columns=columns, show="headings")
+        history_tree.pack(side="left", fill="both", expand=True)
+        headings = {
+            "date": "Дата",
+            "name": "Товар",
+            "qty": "К-сть",
+            "price": "Ціна",
+            "discount": "Знижка, %",
+            "total": "Сума",
+        }
+        for col, text in headings.items():
+            history_tree.heading(col, text=text)
+            history_tree.column(col, width=180 if col == "name" else 100, anchor="center")
 
+        scrollbar = ttk.Scrollbar(history_frame, orient="vertical", command=history_tree.yview)
+        history_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+
+        def show_customers(rows):
+            if not customers_tree.winfo_exists():
+                return  # вікно закрили, поки йшов запит
+            for (cid, name, phone, purchases, units, ltv,
+                 first, last) in rows:
+                customers_tree.insert(
+                    "", "end", iid=str(cid),
+                    values=(name, phone or "-", purchases, units, f"{ltv:.2f}",
+                            first or "-", last or "-")
+                )
+
+        # Без фільтра агрегуються всі покупці — запит у фоновому потоці
+        customers_filter = LiveFilter(
+            self,
+            query=lambda substr, conn: find_customers(substr, conn=conn),
+            on_result=show_customers,
+            on_error=self.show_query_error,
+        )
+        customers_filter.run_now(self.sales_filter_customer.get().strip() or None)
 
+        def on_select(event):
+            for row in history_tree.get_children():
+                history_tree.delete(row)
+            sel = customers_tree.selection()
+            if not sel:
+                return
+            for s in customer_history(int(sel[0])):
+                history_tree.insert(
+                    "", "end",
+                    values=(s.sale_date, s.product_name, s.quantity, f"{s.sale_price:.2f}",
+                            f"{s.discount_percent:.1f}", f"{s.total:.2f}")
+                )
+
+        customers_tree.bind("<<TreeviewSelect>>", on_select)
 
     def create_reports_tab(self):
         top_frame = ttk.Frame(self.reports_frame)
@@ -463,7 +1027,22 @@ class FurnitureApp(tk.Tk):
         ttk.Button(top_frame, text="Експорт залишків у CSV", command=self.export_stock_csv)\
             .pack(side="left", padx=5)
 
-        revenue_frame = ttk.LabelFrame(self.reports_frame, text="Виручка за днями")
+        ttk.Button(top_frame, text="Зведення по магазинах…", command=self.on_consolidate_stores)\
+            .pack(side="left", padx=5)
+
+        ttk.Button(top_frame, text="Архівувати закриті роки", command=self.on_archive_closed_years)\
+            .pack(side="left", padx=5)
+
+        self.reports_notebook = ttk.Notebook(self.reports_frame)
+        self.reports_notebook.pack(side="top", fill="both", expand=True)
+        tables_frame = ttk.Frame(self.reports_notebook)
+        charts_frame = ttk.Frame(self.reports_notebook)
+        self.stores_frame = ttk.Frame(self.reports_notebook)
+        self.reports_notebook.add(tables_frame, text="Таблиці")
+        self.reports_notebook.add(charts_frame, text="Графіки")
+        self.reports_notebook.add(self.stores_frame, text="Мережа магазинів")
+
+        revenue_frame = ttk.LabelFrame(tables_frame, text="Виручка за днями")
         revenue_frame.pack(side="left", fill="both", expand=True, padx=10, pady=10)
 
         self.revenue_tree = ttk.Treeview(
@@ -480,7 +1059,7 @@ class FurnitureApp(tk.Tk):
         self.revenue_tree.configure(yscrollcommand=rev_scroll.set)
         rev_scroll.pack(side="right", fill="y")
 
-        stock_frame = ttk.LabelFrame(self.reports_frame, text="Залишки на складі")
+        stock_frame = ttk.LabelFrame(tables_frame, text="Залишки на складі")
         stock_frame.pack(side="right", fill="both", expand=True, padx=10, pady=10)
 
         self.stock_tree = ttk.Treeview(
@@ -501,22 +1080,161 @@ class FurnitureApp(tk.Tk):
         self.stock_tree.configure(yscrollcommand=stock_scroll.set)
         stock_scroll.pack(side="right", fill="y")
 
+        chart_frame = ttk.LabelFrame(
+            charts_frame,
+            text="Виручка (коліщатко — масштаб, перетягування — зсув, подвійний клік — весь період)"
+        )
+        chart_frame.pack(side="top", fill="both", expand=True, padx=10, pady=5)
+        category_frame = ttk.LabelFrame(charts_frame, text="Виручка за категоріями")
+        category_frame.pack(side="top", fill="x", padx=10, pady=5)
+
+        self.category_chart = CategoryChart(category_frame, height=180)
+        self.revenue_chart = RevenueChart(
+            chart_frame, on_range_change=self.category_chart.schedule_load
+        )
+        self.revenue_chart.pack(fill="both", expand=True)
+        self.category_chart.pack(fill="both", expand=True)
+
+        self.create_stores_view()
+
+    def _make_tree(self, parent, title, headings, side="top", height=8):
+        """LabelFrame з таблицею та вертикальною прокруткою."""
+        frame = ttk.LabelFrame(parent, text=title)
+        frame.pack(side=side, fill="both", expand=True, padx=10, pady=5)
+        tree = ttk.Treeview(frame, columns=tuple(headings), show="headings", height=height)
+        tree.pack(side="left", fill="both", expand=True)
+        for col, text in headings.items():
+            tree.heading(col, text=text)
+            tree.column(col, width=160 if col == "name" else 100, anchor="center")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        return frame, tree
+
+    def create_stores_view(self):
+        self.stores_status = ttk.Label(
+            self.stores_frame,
+            text="Натисніть «Зведення по магазинах…» та оберіть файли БД салонів."
+        )
+        self.stores_status.pack(side="top", anchor="w", padx=10, pady=5)
+
+        _frame, self.stores_tree = self._make_tree(
+            self.stores_frame, "Магазини",
+            {"name": "Магазин", "units": "Продано, од.", "revenue": "Виручка, грн",
+             "stock": "Залишок, од."},
+            height=5,
+        )
+        bottom = ttk.Frame(self.stores_frame)
+        bottom.pack(side="top", fill="both", expand=True)
+        _frame, self.stores_best_tree = self._make_tree(
+            bottom, "Бестселери мережі",
+            {"name": "Товар", "category": "Категорія", "units": "Продано, од.",
+             "revenue": "Виручка, грн"},
+            side="left",
+        )
+        _frame, self.stores_revenue_tree = self._make_tree(
+            bottom, "Виручка мережі за днями",
+            {"date": "Дата", "total": "Виручка, грн"},
+            side="left",
+        )
+        _frame, self.stores_stock_tree = self._make_tree(
+            bottom, "Залишки мережі",
+            {"name": "Товар", "category": "Категорія", "stock": "Залишок"},
+            side="left",
+        )
+
+    def on_archive_closed_years(self):
+        if not messagebox.askyesno(
+            "Підтвердження",
+            "Перенести продажі минулих років в окремі архівні файли?\n"
+            "Звіти та пошук і надалі враховуватимуть архів."
+        ):
+            return
+        try:
+            archived = archive_closed_years()
+        except ValueError as e:
+            messagebox.showerror("Помилка", str(e))
+            return
+        self.invalidate("sales", "reports", "logs")
+        if not archived:
+            messagebox.showinfo("Архів", "Немає продажів за закриті роки.")
+            return
+        lines = [f"{year}: {rows} продажів" for year, rows in sorted(archived.items())]
+        messagebox.showinfo("Архів", "Перенесено в архів:\n" + "\n".join(lines))
+
+    def on_consolidate_stores(self):
+        paths = filedialog.askopenfilenames(
+            title="Оберіть файли БД магазинів",
+            filetypes=[("SQLite DB", "*.db"), ("All files", "*.*")]
+        )
+        if not paths:
+            return
+        self.reports_notebook.select(self.stores_frame)
+        self.stores_status.config(text=f"Обробка {len(paths)} магазинів…")
+
+        result = {}
+
+        def work():
+            try:
+                result["report"] = consolidate(paths)
+            except Exception as e:  # пошкоджений / не той файл
+                result["error"] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+
+        def poll():
+            if worker.is_alive():
+                self.after(100, poll)
+            elif "error" in result:
+                self.stores_status.config(text="Помилка зведення.")
+                messagebox.showerror("Помилка", f"Не вдалося обробити БД: {result['error']}")
+            else:
+                self.show_consolidated(result["report"], len(paths))
+
+        poll()
+
+    def show_consolidated(self, report, store_count):
+        trees = (self.stores_tree, self.stores_best_tree,
+                 self.stores_revenue_tree, self.stores_stock_tree)
+        for tree in trees:
+            for row in tree.get_children():
+                tree.delete(row)
+
+        for store, units, revenue, stock in report["stores"]:
+            self.stores_tree.insert("", "end", values=(store, units, f"{revenue:.2f}", stock))
+        for name, category, units, total in report["bestsellers"]:
+            self.stores_best_tree.insert("", "end",
+                                         values=(name, category, units, f"{total:.2f}"))
+        for date, total in report["revenue_by_day"]:
+            self.stores_revenue_tree.insert("", "end", values=(date, f"{total:.2f}"))
+        for name, category, stock in report["stock"]:
+            self.stores_stock_tree.insert("", "end", values=(name, category, stock))
+
+        total = Money(sum(row[2] for row in report["stores"]))
+        self.stores_status.config(
+            text=f"Магазинів: {store_count}. Загальна виручка: {total:.2f} грн."
+        )
+
     def refresh_reports(self):
         for row in self.revenue_tree.get_children():
             self.revenue_tree.delete(row)
 
-        for date, total in report_total_by_day():
-            self.revenue_tree.insert("", "end",
-                                     values=(date, f"{total:.2f}"))
+        try:
+            for date, total in iter_total_by_day():
+                self.revenue_tree.insert("", "end",
+                                         values=(date, f"{total:.2f}"))
+            self.revenue_chart.refresh()
+        except ValueError as e:
+            # Напр., не знайдено архівний файл року
+            self.show_query_error(e)
 
         for row in self.stock_tree.get_children():
             self.stock_tree.delete(row)
 
-        products = list_products()
-        for (pid, name, category, material, color,
-             width, height, depth, price, stock) in products:
+        for p in iter_products():
             self.stock_tree.insert("", "end",
-                                   values=(pid, name, category, stock))
+                                   values=(p.id, p.name, p.category, p.stock_qty))
 
     def export_revenue_csv(self):
         filename = filedialog.asksaveasfilename(
@@ -526,12 +1244,11 @@ class FurnitureApp(tk.Tk):
         )
         if not filename:
             return
-        rows = report_total_by_day()
         try:
             with open(filename, "w", newline="", encoding="utf-8-sig") as f:
                 writer = csv.writer(f, delimiter=";")
                 writer.writerow(["Дата", "Виручка, грн"])
-                for date, total in rows:
+                for date, total in iter_total_by_day():
                     writer.writerow([date, f"{total:.2f}"])
             messagebox.showinfo("Експорт", "Звіт по виручці збережено.")
         except Exception as e:
@@ -545,7 +1262,6 @@ class FurnitureApp(tk.Tk):
         )
         if not filename:
             return
-        rows = list_products()
         try:
             with open(filename, "w", newline="", encoding="utf-8-sig") as f:
                 writer = csv.writer(f, delimiter=";")
@@ -553,12 +1269,11 @@ class FurnitureApp(tk.Tk):
                     "ID", "Назва", "Категорія", "Матеріал", "Колір",
                     "Ширина", "Висота", "Глибина", "Ціна, грн", "Залишок"
                 ])
-                for (pid, name, category, material, color,
-                     width, height, depth, price, stock) in rows:
+                for p in iter_products():
                     writer.writerow([
-                        pid, name, category, material or "", color or "",
-                        width or "", height or "", depth or "",
-                        f"{price:.2f}", stock
+                        p.id, p.name, p.category, p.material or "", p.color or "",
+                        p.width or "", p.height or "", p.depth or "",
+                        f"{p.base_price:.2f}", p.stock_qty
                     ])
             messagebox.showinfo("Експорт", "Звіт по залишках збережено.")
         except Exception as e:
@@ -572,10 +1287,53 @@ class FurnitureApp(tk.Tk):
         ttk.Button(top_frame, text="Оновити журнал", command=self.refresh_logs)\
             .pack(side="left", padx=5)
 
+        ttk.Button(top_frame, text="◀ Новіші", command=self.on_logs_newer)\
+            .pack(side="left", padx=5)
+
+        ttk.Button(top_frame, text="Старіші ▶", command=self.on_logs_older)\
+            .pack(side="left", padx=5)
+
+        self.logs_page_label = ttk.Label(top_frame, text="")
+        self.logs_page_label.pack(side="left", padx=10)
+
+        # Фільтр журналу
+        filter_frame = ttk.LabelFrame(self.logs_frame, text="Фільтр журналу")
+        filter_frame.pack(side="top", fill="x", padx=10, pady=5)
+
+        ttk.Label(filter_frame, text="Дата від (РРРР-ММ-ДД):").grid(row=0, column=0, padx=5, pady=2, sticky="e")
+        self.logs_filter_from = ttk.Entry(filter_frame, width=12)
+        self.logs_filter_from.grid(row=0, column=1, padx=5, pady=2, sticky="w")
+
+        ttk.Label(filter_frame, text="до:").grid(row=0, column=2, padx=5, pady=2, sticky="e")
+        self.logs_filter_to = ttk.Entry(filter_frame, width=12)
+        self.logs_filter_to.grid(row=0, column=3, padx=5, pady=2, sticky="w")
+
+        ttk.Label(filter_frame, text="Дія:").grid(row=0, column=4, padx=5, pady=2, sticky="e")
+        self.logs_filter_action = ttk.Combobox(filter_frame, width=18)
+        self.logs_filter_action.grid(row=0, column=5, padx=5, pady=2, sticky="w")
+
+        ttk.Label(filter_frame, text="Користувач:").grid(row=1, column=0, padx=5, pady=2, sticky="e")
+        self.logs_filter_user = ttk.Combobox(filter_frame, width=12)
+        self.logs_filter_user.grid(row=1, column=1, padx=5, pady=2, sticky="w")
+
+        ttk.Label(filter_frame, text="Об'єкт:").grid(row=1, column=2, padx=5, pady=2, sticky="e")
+        self.logs_filter_entity = ttk.Combobox(filter_frame, width=12)
+        self.logs_filter_entity.grid(row=1, column=3, padx=5, pady=2, sticky="w")
+
+        ttk.Label(filter_frame, text="ID об'єкта:").grid(row=1, column=4, padx=5, pady=2, sticky="e")
+        self.logs_filter_entity_id = ttk.Entry(filter_frame, width=10)
+        self.logs_filter_entity_id.grid(row=1, column=5, padx=5, pady=2, sticky="w")
+
+        filter_btn = ttk.Button(filter_frame, text="Застосувати фільтр", command=self.refresh_logs)
+        filter_btn.grid(row=0, column=6, padx=5, pady=2)
+
+        reset_btn = ttk.Button(filter_frame, text="Скинути", command=self.reset_logs_filters)
+        reset_btn.grid(row=1, column=6, padx=5, pady=2)
+
         list_frame = ttk.LabelFrame(self.logs_frame, text="Журнал дій системи")
         list_frame.pack(side="top", fill="both", expand=True, padx=10, pady=10)
 
-        columns = ("ts", "user", "action", "details")
+        columns = ("ts", "user", "action", "entity", "details")
         self.logs_tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=20)
         self.logs_tree.pack(side="left", fill="both", expand=True)
 
@@ -583,22 +1341,80 @@ class FurnitureApp(tk.Tk):
             "ts": "Час",
             "user": "Користувач",
             "action": "Дія",
+            "entity": "Об'єкт",
             "details": "Деталі"
         }
         for col, text in headings.items():
             self.logs_tree.heading(col, text=text)
-            width = 120 if col in ("ts", "user") else 300
+            width = 120 if col in ("ts", "user", "action", "entity") else 300
             self.logs_tree.column(col, width=width, anchor="w")
 
         scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.logs_tree.yview)
         self.logs_tree.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side="right", fill="y")
 
+        # Курсори сторінок: [None, (ts, id) останнього рядка 1-ї сторінки, ...]
+        self.logs_cursors = [None]
+        self.logs_last_key = None
+
+    def reset_logs_filters(self):
+        for entry in (self.logs_filter_from, self.logs_filter_to,
+                      self.logs_filter_action, self.logs_filter_user,
+                      self.logs_filter_entity, self.logs_filter_entity_id):
+            entry.delete(0, tk.END)
+        self.refresh_logs()
+
+    def _read_logs_filters(self):
+        entity_id_raw = self.logs_filter_entity_id.get().strip()
+        return {
+            "date_from": _parse_optional_date(self.logs_filter_from.get()),
+            "date_to": _parse_optional_date(self.logs_filter_to.get()),
+            "action": self.logs_filter_action.get().strip() or None,
+            "user": self.logs_filter_user.get().strip() or None,
+            "entity_type": self.logs_filter_entity.get().strip() or None,
+            "entity_id": int(entity_id_raw) if entity_id_raw else None,
+        }
+
     def refresh_logs(self):
+        """Перша сторінка журналу за поточним фільтром."""
+        self.logs_filter_action["values"] = list_log_values("action")
+        self.logs_filter_user["values"] = list_log_values("user")
+        self.logs_filter_entity["values"] = list_log_values("entity_type")
+        self.logs_cursors = [None]
+        self.show_logs_page()
+
+    def on_logs_older(self):
+        if self.logs_last_key is None:
+            return
+        self.logs_cursors.append(self.logs_last_key)
+        self.show_logs_page()
+
+    def on_logs_newer(self):
+        if len(self.logs_cursors) <= 1:
+            return
+        self.logs_cursors.pop()
+        self.show_logs_page()
+
+    def show_logs_page(self):
+        try:
+            filters = self._read_logs_filters()
+        except ValueError:
+            messagebox.showerror("Помилка", "Невірна дата (РРРР-ММ-ДД) або ID об'єкта.")
+            return
+
         for row in self.logs_tree.get_children():
             self.logs_tree.delete(row)
 
-        logs = list_logs(limit=200)
-        for ts, user, action, details in logs:
+        logs = search_logs(**filters, after=self.logs_cursors[-1], limit=LOGS_PAGE_SIZE)
+        for (log_id, ts, user, action, entity_type, entity_id,
+             details, payload) in logs:
+            entity = f"{entity_type} #{entity_id}" if entity_type else ""
             self.logs_tree.insert("", "end",
-                                  values=(ts, user or "-", action, details or ""))
+                                  values=(ts, user or "-", action, entity, details or ""))
+
+        # Якщо сторінка неповна — старіших записів немає
+        if len(logs) == LOGS_PAGE_SIZE:
+            self.logs_last_key = (logs[-1][1], logs[-1][0])
+        else:
+            self.logs_last_key = None
+        self.logs_page_label.config(text=f"Сторінка {len(self.logs_cursors)}")